@@ -0,0 +1,55 @@
+"""
+Throughput of the batch evaluation (connect4.batch) for 1e3 to 1e6 boards, on 6x7 and 10x10 boards,
+against the scalar functions called board by board (on the first 1e3 boards).
+
+Usage: python benchmarks/batch_throughput.py [max_boards]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from connect4.batch import batch_evaluate  # noqa: E402
+from connect4.board import check_win, is_game_over  # noqa: E402
+from connect4.evaluation import evaluate  # noqa: E402
+
+BOARD_SIZES = ((6, 7), (10, 10))
+SCALAR_BOARDS = 1000
+
+
+def random_boards(count: int, rows: int, cols: int, seed: int = 0) -> np.ndarray:
+    """
+    :return: (count, rows, cols) int8 array of random boards (a third of the cells free)
+    """
+    generator = np.random.default_rng(seed)
+    return generator.choice(np.array([0, 1, 2], dtype=np.int8), size=(count, rows, cols))
+
+
+def scalar_evaluate(boards):
+    for board in boards:
+        check_win(board, 1) or check_win(board, 2)
+        is_game_over(board)
+        evaluate(board.ravel(), board.shape[0], board.shape[1], 2)
+
+
+def run(max_boards: int = 10 ** 6):
+    for rows, cols in BOARD_SIZES:
+        boards = random_boards(max_boards, rows, cols)
+        start = time.perf_counter()
+        scalar_evaluate(boards[:SCALAR_BOARDS])
+        print('%dx%d scalar: %.0f positions/s' % (rows, cols, SCALAR_BOARDS / (time.perf_counter() - start)))
+        count = 1000
+        while count <= max_boards:
+            start = time.perf_counter()
+            batch_evaluate(boards[:count])
+            elapsed = time.perf_counter() - start
+            print('%dx%d batch %7d boards: %.3f s, %.0f positions/s' % (rows, cols, count, elapsed, count / elapsed),
+                  flush=True)
+            count *= 10
+
+
+if __name__ == '__main__':
+    run(int(float(sys.argv[1])) if len(sys.argv) > 1 else 10 ** 6)
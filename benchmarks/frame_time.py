@@ -0,0 +1,69 @@
+"""
+Time spent redrawing the board after a move (GameBoard.draw_board), on 6x7 and 10x10 boards.
+
+Usage: python benchmarks/frame_time.py [moves]
+
+Runs the pygame front-end without a window (SDL 'dummy' video driver): random moves are dropped
+on the board and every redraw is timed. Polling redraws (the board did not change) are timed separately.
+With the dummy driver, screen updates cost almost nothing, so the number of pygame.display.update
+calls per redraw (each one a flip of the window on a real display) is reported as well.
+"""
+import os
+import random
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import main  # noqa: E402
+from connect4 import GameConfig  # noqa: E402
+
+BOARD_SIZES = ((6, 7), (10, 10))
+
+
+def summary(times) -> str:
+    times = sorted(times)
+    return 'median %.3f ms, p95 %.3f ms' % (statistics.median(times) * 1000,
+                                           times[min(len(times) - 1, int(0.95 * len(times)))] * 1000)
+
+
+def run(moves: int = 40):
+    os.chdir(ROOT)  # for the window icon
+    generator = random.Random(0)
+    for rows, cols in BOARD_SIZES:
+        main.setup(GameConfig('human', rows, cols, 'human'))
+        # count the screen updates:
+        display_update = main.pygame.display.update
+        updates = [0]
+
+        def counting_update(*args):
+            updates[0] += 1
+            return display_update(*args)
+
+        main.pygame.display.update = counting_update
+        game = main.game
+        main.game_board.draw_board(game)
+        after_move, polling = [], []
+        updates[0] = 0
+        for _ in range(moves):
+            if game.over:
+                break
+            game.play(generator.choice(game.legal_moves()))
+            start = time.perf_counter()
+            main.game_board.draw_board(game)
+            after_move.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            main.game_board.draw_board(game)
+            polling.append(time.perf_counter() - start)
+        main.pygame.display.update = display_update
+        print('%dx%d: redraw after a move %s; redraw without change %s; %.1f display updates per redraw'
+              % (rows, cols, summary(after_move), summary(polling), updates[0] / (2 * len(after_move))))
+    main.pygame.quit()
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 40)
@@ -0,0 +1,48 @@
+"""
+Measure how long importing the headless engine ('connect4') takes, in a fresh interpreter for every run.
+
+Usage: python benchmarks/import_time.py [runs]
+
+Exits with status 1 if the median import time is above IMPORT_BUDGET_MS
+or if importing the engine pulled in a GUI library (pygame, tkinter).
+"""
+import os
+import statistics
+import subprocess
+import sys
+
+# maximum median import time (in milliseconds):
+IMPORT_BUDGET_MS = 300
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = '''
+import sys, time
+start = time.perf_counter()
+import connect4
+elapsed = (time.perf_counter() - start) * 1000
+print(elapsed, int('pygame' in sys.modules or 'tkinter' in sys.modules))
+'''
+
+
+def measure(runs: int = 10):
+    """
+    :param runs: number of fresh interpreters to start
+    :return: (list of import times in milliseconds, whether a GUI library was imported)
+    """
+    times, gui = [], False
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', PROBE], cwd=ROOT, check=True, capture_output=True, text=True)
+        elapsed, gui_loaded = output.stdout.split()
+        times.append(float(elapsed))
+        gui = gui or gui_loaded == '1'
+    return times, gui
+
+
+if __name__ == '__main__':
+    times, gui = measure(int(sys.argv[1]) if len(sys.argv) > 1 else 10)
+    median = statistics.median(times)
+    print('import connect4: median %.1f ms, min %.1f ms, max %.1f ms (budget %d ms)'
+          % (median, min(times), max(times), IMPORT_BUDGET_MS))
+    if gui:
+        print('error: importing connect4 imported a GUI library')
+    sys.exit(1 if gui or median > IMPORT_BUDGET_MS else 0)
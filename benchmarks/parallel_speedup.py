@@ -0,0 +1,57 @@
+"""
+Speedup of the parallel root search (connect4.parallel) over the serial search, for 1, 2, 4 and 8 workers.
+
+Usage: python benchmarks/parallel_speedup.py [depth]
+
+Every position is searched to a fixed depth from empty transposition tables, serially and
+with each worker count; the parallel search must return the same move as the serial one.
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from connect4 import Engine, Position  # noqa: E402
+from connect4.parallel import ParallelSearch  # noqa: E402
+
+WORKER_COUNTS = (1, 2, 4, 8)
+BOARD_SIZES = ((6, 7), (8, 8), (10, 10))
+
+
+def positions(count: int = 3, seed: int = 0):
+    """
+    :return: list of positions after a few random (non-winning) moves, for every size in BOARD_SIZES
+    """
+    generator = random.Random(seed)
+    result = []
+    for rows, cols in BOARD_SIZES:
+        for _ in range(count):
+            position = Position(rows, cols, 1)
+            for _ in range(generator.randint(2, 8)):
+                position.play(generator.choice([col for col in position.legal_moves()
+                                                if not position.is_winning_move(col)]))
+            result.append(position)
+    return result
+
+
+def run(depth: int = 8):
+    boards = positions()
+    start = time.perf_counter()
+    serial = [Engine(depth, random_ties=False).search(position, None, depth) for position in boards]
+    serial_time = time.perf_counter() - start
+    print('%d positions, depth %d, %d CPU(s)' % (len(boards), depth, os.cpu_count() or 1))
+    print('serial: %.2f s, %d nodes' % (serial_time, sum(result[2].nodes for result in serial)))
+    for workers in WORKER_COUNTS:
+        with ParallelSearch(depth, workers, random_ties=False, keep_tables=False) as search:
+            start = time.perf_counter()
+            results = [search.search(position, None, depth) for position in boards]
+            elapsed = time.perf_counter() - start
+        same = sum(result[0] == expected[0] for result, expected in zip(results, serial))
+        print('%d worker(s): %.2f s, speedup %.2fx, same move %d/%d, %d nodes'
+              % (workers, elapsed, serial_time / elapsed, same, len(boards), sum(result[2].nodes for result in results)))
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 8)
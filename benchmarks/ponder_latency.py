@@ -0,0 +1,75 @@
+"""
+AI response time of the hard level with and without pondering (connect4.background), on a 6x7 board.
+
+Usage: python benchmarks/ponder_latency.py [games] [think_seconds]
+
+The human is played by a depth-3 engine that takes think_seconds per move (the AI ponders meanwhile).
+The time from the human's move to the AI's answer is measured, as the GUI sees it.
+"""
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from connect4 import BackgroundSearch, Engine, OpeningBook, Position, Solver  # noqa: E402
+from connect4.search import DIFFICULTIES  # noqa: E402
+
+ROWS, COLS = 6, 7
+
+
+def make_hard_ai(rows: int, cols: int) -> Engine:
+    ply, time_budget_ms = DIFFICULTIES['hard']
+    return Engine(ply, time_budget_ms=time_budget_ms, book=OpeningBook.for_size(rows, cols),
+                  solver=Solver(db_path=None))
+
+
+def play(background: BackgroundSearch, human: Engine, think: float, ponder: bool, generator):
+    """
+    :return: (AI response times in seconds, number of pondered answers) of one game
+    """
+    position = Position(ROWS, COLS, 1)
+    # a random first move, so that the games differ:
+    position.play(generator.choice(position.legal_moves()))
+    latencies, pondered = [], 0
+    human.tt.clear()
+    while not position.is_full():
+        if position.turn == 2:
+            start = time.perf_counter()
+            background.start(position)
+            _, _, col, _, stats = background.wait()
+            latencies.append(time.perf_counter() - start)
+            pondered += stats.pondered
+        else:
+            if ponder:
+                background.ponder(position)
+            start = time.perf_counter()
+            col = human.choose_move(position)
+            time.sleep(max(0.0, think - (time.perf_counter() - start)))
+        if position.is_winning_move(col):
+            break
+        position.play(col)
+    return latencies, pondered
+
+
+def run(games: int = 2, think: float = 2.0):
+    for ponder in (False, True):
+        generator = random.Random(0)
+        latencies, pondered = [], 0
+        with BackgroundSearch(make_hard_ai, ROWS, COLS) as background:
+            for _ in range(games):
+                game_latencies, game_pondered = play(background, Engine(3, random_ties=False), think, ponder,
+                                                     generator)
+                latencies += game_latencies
+                pondered += game_pondered
+        latencies.sort()
+        print('%s: %d AI moves, %d pondered, response median %.0f ms, p90 %.0f ms, max %.0f ms, mean %.0f ms'
+              % ('pondering' if ponder else 'no pondering', len(latencies), pondered,
+                 statistics.median(latencies) * 1000, latencies[int(0.9 * (len(latencies) - 1))] * 1000,
+                 latencies[-1] * 1000, statistics.mean(latencies) * 1000), flush=True)
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 2, float(sys.argv[2]) if len(sys.argv) > 2 else 2.0)
@@ -0,0 +1,88 @@
+"""
+Memory allocated by the AI search (connect4.search.Engine), measured around whole searches,
+on 6x7 middle-game positions searched to depth 7.
+
+Usage: python benchmarks/search_allocations.py [positions]
+
+For every search (from an empty transposition table, so the node counts of two versions of the engine
+can be compared), the report gives:
+- the memory blocks allocated during the search and not freed when it returned (sys.getallocatedblocks),
+  in total and per node
+- the peak of the memory traced by tracemalloc during the search, above the memory traced when it started
+
+CPython counts the blocks alive, not the allocations: blocks allocated and freed again during the search
+(the (column, score) tuples returned by minimax and the masks of Position.threats and tactical_moves, built
+at every node) only show in the peak.
+"""
+import gc
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from connect4.board import Position  # noqa: E402
+from connect4.search import Engine, forced_move  # noqa: E402
+
+DEPTH = 7
+
+
+def random_position(generator, moves: int = 8) -> Position:
+    """
+    :return: 6x7 position after 'moves' random moves that do not end the game, without a forced move
+             (see connect4.search.forced_move) for player 2, to move
+    """
+    while True:
+        position = Position(6, 7, 1)
+        for _ in range(moves):
+            col = generator.choice(position.legal_moves())
+            if position.is_winning_move(col):
+                break
+            position.play(col)
+        else:
+            if forced_move(position) is None:
+                return position
+
+
+def measure(engine: Engine, position: Position):
+    """
+    :return: (blocks left by the search, peak bytes traced, nodes, seconds of the untraced search)
+    """
+    engine.tt.clear()
+    gc.collect()
+    start_blocks = sys.getallocatedblocks()
+    start = time.perf_counter()
+    stats = engine.search(position)[2]
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    blocks = sys.getallocatedblocks() - start_blocks
+    # the same search again, traced:
+    engine.tt.clear()
+    tracemalloc.start()
+    start_memory = tracemalloc.get_traced_memory()[0]
+    engine.search(position)
+    peak = tracemalloc.get_traced_memory()[1] - start_memory
+    tracemalloc.stop()
+    return blocks, peak, stats.nodes, elapsed
+
+
+def run(positions: int = 5):
+    generator = random.Random(0)
+    engine = Engine(DEPTH, random_ties=False)
+    engine.search(Position(6, 7, 1))  # tables and caches of the board size
+    totals = [0.0] * 4
+    for _ in range(positions):
+        result = measure(engine, random_position(generator))
+        totals = [total + value for total, value in zip(totals, result)]
+        blocks, peak, nodes, _ = result
+        print('%d blocks left (%.4f per node), peak %d B, %d nodes' % (blocks, blocks / nodes, peak, nodes),
+              flush=True)
+    blocks, peak, nodes, elapsed = (total / positions for total in totals)
+    print('mean: %.1f blocks left per search (%.4f per node), peak %.0f B, %.0f nodes, %.0f nodes/s'
+          % (blocks, blocks / nodes, peak, nodes, nodes / elapsed))
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
@@ -0,0 +1,128 @@
+"""
+Load test of the game server (connect4.server): many concurrent games on a local server.
+
+Usage: python benchmarks/server_load.py [--games 2000] [--connections 100] [--hard 8] [--think 500]
+                                        [--workers W]
+
+The server runs in this process, on a free port. Each connection plays its share of the easy games,
+all at once (one request in flight per game, random legal moves after 'think' ms on average; 0: as fast as
+possible); meanwhile 'hard' games run hard-level searches in the process pool. The latency of the easy
+games' moves (measured by the clients) shows whether slow searches hold up the other games; the server's
+own metrics are printed at the end.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from connect4.server import GameServer, latency_summary  # noqa: E402
+
+
+class Client(object):
+    """
+    Class for a client connection (requests matched with their responses by id).
+
+    Methods for:
+    - connecting, closing
+    - sending a request and waiting for its response
+    """
+
+    def __init__(self):
+        self.reader = self.writer = None
+        self.pending = {}
+        self.ids = itertools.count()
+        self.listener = None
+
+    async def connect(self, port: int):
+        self.reader, self.writer = await asyncio.open_connection('127.0.0.1', port)
+        self.listener = asyncio.ensure_future(self.listen())
+
+    async def listen(self):
+        while True:
+            line = await self.reader.readline()
+            if not line:
+                return
+            response = json.loads(line)
+            self.pending.pop(response['id']).set_result(response)
+
+    async def request(self, **request):
+        request['id'] = next(self.ids)
+        future = asyncio.get_running_loop().create_future()
+        self.pending[request['id']] = future
+        self.writer.write(json.dumps(request).encode() + b'\n')
+        await self.writer.drain()
+        return await future
+
+    async def close(self):
+        self.writer.close()
+        await self.listener
+
+
+async def play(client: Client, level: str, think: float, generator, latencies):
+    """
+    Play one game (random legal moves, 'think' seconds apart on average) against the AI of 'level';
+    move latencies are added to 'latencies'.
+    """
+    state = await client.request(cmd='new', rows=6, cols=7, level=level, first='human')
+    full = [0] * 7
+    for col in state['moves']:
+        full[col] += 1
+    while not state['over']:
+        col = generator.choice([col for col in range(7) if full[col] < 6])
+        await asyncio.sleep(generator.uniform(0, 2 * think))
+        start = time.perf_counter()
+        state = await client.request(cmd='move', game=state['game'], col=col)
+        latencies.append(time.perf_counter() - start)
+        if not state['ok']:
+            raise RuntimeError(state['error'])
+        for col in state['moves'][-2:]:
+            full[col] += 1
+    return state
+
+
+async def run(games: int, connections: int, hard: int, think: float, workers: int):
+    server = GameServer(port=0, workers=workers)
+    await server.start()
+    generator = random.Random(0)
+    clients = [Client() for _ in range(connections)]
+    for client in clients:
+        await client.connect(server.port)
+    easy_latencies, hard_latencies = [], []
+    start = time.perf_counter()
+    tasks = [play(clients[i % connections], 'easy', think, generator, easy_latencies) for i in range(games)]
+    tasks += [play(clients[i % connections], 'hard', think, generator, hard_latencies) for i in range(hard)]
+    results = await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start
+    metrics = await clients[0].request(cmd='metrics')
+    for client in clients:
+        await client.close()
+    await server.close()
+    print('%d easy + %d hard games on %d connections in %.1f s (%d moves, %.0f requests/s), %d CPU(s)'
+          % (games, hard, connections, elapsed, len(easy_latencies) + len(hard_latencies),
+             metrics['requests'] / elapsed, os.cpu_count() or 1))
+    print('human won %d, AI won %d, draws %d' % tuple(sum(state['winner'] == winner for state in results)
+                                                      for winner in (1, 2, 0)))
+    print('client latency, easy moves:', latency_summary(easy_latencies))
+    print('client latency, hard moves:', latency_summary(hard_latencies))
+    print('server metrics:', json.dumps(metrics))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Load test of the game server.')
+    parser.add_argument('--games', type=int, default=2000, help='concurrent easy games')
+    parser.add_argument('--connections', type=int, default=100)
+    parser.add_argument('--hard', type=int, default=8, help='concurrent hard games (searches in the pool)')
+    parser.add_argument('--think', type=float, default=500, help='mean time between the moves of a game (ms)')
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args(argv)
+    asyncio.run(run(args.games, args.connections, args.hard, args.think / 1000, args.workers))
+
+
+if __name__ == '__main__':
+    main()
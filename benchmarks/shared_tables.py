@@ -0,0 +1,62 @@
+"""
+Check that engines keeping their transposition tables between moves score positions like fresh engines,
+when the same engine plays both sides (so its table holds entries searched for either player).
+
+Usage: python benchmarks/shared_tables.py [games]
+
+Self-play games from random openings, at a fixed depth: every position is searched by the engine
+playing the game (serial, and parallel with keep_tables on) and by a new engine. Exits with status 1
+if any score differs.
+"""
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from connect4 import Engine, Position  # noqa: E402
+from connect4.parallel import ParallelSearch  # noqa: E402
+
+DEPTH = 5
+PARALLEL_GAMES = 2
+PARALLEL_WORKERS = 2
+
+
+def self_play(engine, games: int, seed: int = 0):
+    """
+    :param engine: engine (or parallel search) playing both sides of every game, tables kept between moves
+    :return: (positions searched, list of (columns played, score of the engine, score of a new engine) that differ)
+    """
+    generator = random.Random(seed)
+    count, differences = 0, []
+    for _ in range(games):
+        position, played = Position(6, 7, 1), []
+        for _ in range(4):
+            played.append(generator.choice(position.legal_moves()))
+            position.play(played[-1])
+        while not position.is_full():
+            column, score, _ = engine.search(position.copy())
+            expected = Engine(DEPTH, tt_memory_mb=4, random_ties=False).search(position.copy())[1]
+            count += 1
+            if score != expected:
+                differences.append((list(played), score, expected))
+            if position.is_winning_move(column):
+                break
+            position.play(column)
+            played.append(column)
+    return count, differences
+
+
+def run(games: int = 20):
+    count, differences = self_play(Engine(DEPTH, tt_memory_mb=4, random_ties=False), games)
+    with ParallelSearch(DEPTH, PARALLEL_WORKERS, tt_memory_mb=4, random_ties=False, keep_tables=True) as search:
+        parallel_count, parallel_differences = self_play(search, min(games, PARALLEL_GAMES))
+    print('serial: %d positions, %d different score(s)' % (count, len(differences)))
+    print('parallel: %d positions, %d different score(s)' % (parallel_count, len(parallel_differences)))
+    for played, score, expected in differences + parallel_differences:
+        print('  after columns %s: %d instead of %d' % (played, score, expected))
+    return not differences and not parallel_differences
+
+
+if __name__ == '__main__':
+    sys.exit(0 if run(int(sys.argv[1]) if len(sys.argv) > 1 else 20) else 1)
@@ -0,0 +1,285 @@
+"""
+Benchmark suite for the rules, the evaluation and the search, on every board size.
+
+Usage: python benchmarks/suite.py [--output FILE] [--baseline FILE] [--save-baseline] [--tolerance T]
+
+Measured:
+- rules: check_win / check_win_at / is_game_over on virtual boards, Position.has_won
+- move generation: get_available_moves and the drop path (virtual board), Position.play + undo
+- evaluation (leaf cost): compute_score on arrays and positions, reference loop, incremental update
+- search: nodes and time of a fixed-depth search of fixed positions, for every size from 4x4 to 10x10
+- perft: number of move sequences of each length from a fixed position (a win ends a sequence),
+  counted on positions and, as a cross-check of move generation and win detection, on virtual boards
+
+Times are per call, median and p95 over the repeats. Results are written to a JSON file; with a
+baseline (a results file saved earlier), timings slower than baseline * (1 + tolerance) and searches
+visiting more nodes are flagged, and any perft difference is an error. Exits with status 1 if
+something was flagged.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from connect4 import Engine, IncrementalEvaluator, Position, compute_score_reference  # noqa: E402
+from connect4.board import (check_win, check_win_at, get_available_moves, is_game_over,  # noqa: E402
+                            next_free_row_on_col)
+from connect4.config import MAX_SIZE, MIN_SIZE  # noqa: E402
+from connect4.search import forced_move  # noqa: E402
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+RESULTS_FILE = os.path.join(HERE, 'results.json')
+BASELINE_FILE = os.path.join(HERE, 'baseline.json')
+
+# board sizes of the micro-benchmarks (rules, move generation, evaluation):
+MICRO_SIZES = ((4, 4), (6, 7), (10, 10))
+# every board size (search and perft):
+ALL_SIZES = tuple((rows, cols) for rows in range(MIN_SIZE, MAX_SIZE + 1) for cols in range(MIN_SIZE, MAX_SIZE + 1))
+# fixed-depth search: depth and number of positions per board size:
+SEARCH_DEPTH = 5
+SEARCH_POSITIONS = 3
+# perft depth on positions, and on virtual boards (slower, cross-check):
+PERFT_DEPTH = 5
+PERFT_CHECK_DEPTH = 4
+# timing: number of repeats, and minimum duration of one repeat (in seconds):
+REPEATS = 15
+REPEAT_TIME = 0.02
+
+
+def random_position(rows: int, cols: int, moves: int, generator):
+    """
+    :return: Position after 'moves' random moves, none of them winning (fewer if the board fills up)
+    """
+    position = Position(rows, cols, 1)
+    for _ in range(moves):
+        candidates = [col for col in position.legal_moves() if not position.is_winning_move(col)]
+        if not candidates:
+            break
+        position.play(generator.choice(candidates))
+    return position
+
+
+def measure(function, repeats: int = REPEATS):
+    """
+    Function timing calls of 'function' (no arguments): each repeat runs it for at least REPEAT_TIME.
+
+    :return: {'median_us': ..., 'p95_us': ...} time per call in microseconds over the repeats
+    """
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        if time.perf_counter() - start >= REPEAT_TIME:
+            break
+        number *= 2
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        times.append((time.perf_counter() - start) / number * 1e6)
+    return summarize(times)
+
+
+def summarize(times):
+    times = sorted(times)
+    return {'median_us': statistics.median(times), 'p95_us': times[min(len(times) - 1, int(0.95 * len(times)))]}
+
+
+def micro_benchmarks(rows: int, cols: int):
+    """
+    :return: {name: timing} for the rules, move generation and evaluation on a mid-game rows x cols board
+    """
+    position = random_position(rows, cols, rows * cols // 3, random.Random(rows * 100 + cols))
+    board = position.to_board()
+    # last piece dropped (for check_win_at) and a free column (for the drop path):
+    last = position.stack[-1]
+    row = next_free_row_on_col(board, last) + 1
+    col = position.legal_moves()[0]
+    cell = next_free_row_on_col(board, col) * cols + col
+    evaluator = IncrementalEvaluator(position, 2)
+    engine = Engine(0, tt_memory_mb=1)
+
+    def drop():
+        free_row = next_free_row_on_col(board, col)
+        board[free_row][col] = 1
+        board[free_row][col] = 0
+
+    def play_undo():
+        position.play(col)
+        position.undo()
+
+    def incremental():
+        evaluator.add(cell, 1)
+        evaluator.remove(cell, 1)
+
+    benchmarks = {
+        'check_win': lambda: check_win(board, 1),
+        'check_win_at': lambda: check_win_at(board, row, last),
+        'is_game_over': lambda: is_game_over(board),
+        'Position.has_won': lambda: position.has_won(1),
+        'get_available_moves': lambda: get_available_moves(board),
+        'drop': drop,
+        'Position.play+undo': play_undo,
+        'compute_score(array)': lambda: engine.compute_score(board, 2),
+        'compute_score(Position)': lambda: engine.compute_score(position, 2),
+        'compute_score_reference': lambda: compute_score_reference(board, 2),
+        'IncrementalEvaluator.add+remove': incremental,
+    }
+    return {'%s %dx%d' % (name, rows, cols): measure(function) for name, function in benchmarks.items()}
+
+
+def search_benchmarks(rows: int, cols: int, repeats: int = 3):
+    """
+    Fixed-depth searches of SEARCH_POSITIONS fixed positions, each from a new engine (so results don't
+    depend on what was searched before). Positions with a forced move (see connect4.search.forced_move)
+    are drawn again: the engine plays those without searching.
+
+    :return: ({name: timing of one search}, {name: nodes of one search})
+    """
+    generator = random.Random(rows * 100 + cols)
+    timings, nodes = {}, {}
+    for index in range(SEARCH_POSITIONS):
+        position = random_position(rows, cols, generator.randint(0, rows * cols // 4), generator)
+        while forced_move(position) is not None:
+            position = random_position(rows, cols, generator.randint(0, rows * cols // 4), generator)
+        name = 'search %dx%d #%d' % (rows, cols, index)
+        times = []
+        for _ in range(repeats):
+            engine = Engine(SEARCH_DEPTH, tt_memory_mb=1, random_ties=False)
+            start = time.perf_counter()
+            stats = engine.search(position, None, SEARCH_DEPTH)[2]
+            times.append((time.perf_counter() - start) * 1e6)
+        timings[name] = summarize(times)
+        nodes[name] = stats.nodes
+    return timings, nodes
+
+
+def perft_position(rows: int, cols: int):
+    """
+    :return: fixed position (half the board filled at random) perft counts start from
+    """
+    return random_position(rows, cols, rows * cols // 2, random.Random(rows * 100 + cols + 1))
+
+
+def perft(position, depth: int) -> int:
+    """
+    :return: number of move sequences of length 'depth' from 'position' (or shorter ones ending in a win or a full board)
+    """
+    if depth == 0 or position.is_full():
+        return 1
+    count = 0
+    for col in position.legal_moves():
+        if position.is_winning_move(col):
+            count += 1
+        else:
+            position.play(col)
+            count += perft(position, depth - 1)
+            position.undo()
+    return count
+
+
+def perft_board(board, depth: int, value: int = 1) -> int:
+    """
+    perft on a virtual board (get_available_moves, next_free_row_on_col and check_win_at).
+    """
+    moves = get_available_moves(board)
+    if depth == 0 or not moves:
+        return 1
+    count = 0
+    for col in moves:
+        row = next_free_row_on_col(board, col)
+        board[row][col] = value
+        if check_win_at(board, row, col):
+            count += 1
+        else:
+            count += perft_board(board, depth - 1, 3 - value)
+        board[row][col] = 0
+    return count
+
+
+def run(sizes=ALL_SIZES, micro_sizes=MICRO_SIZES):
+    """
+    :return: results (dictionary saved as JSON) and list of errors (perft mismatches)
+    """
+    results = {'python': platform.python_version(), 'numpy': np.__version__, 'platform': platform.platform(),
+               'timings': {}, 'nodes': {}, 'perft': {}}
+    errors = []
+    for rows, cols in micro_sizes:
+        print('micro-benchmarks %dx%d' % (rows, cols), flush=True)
+        results['timings'].update(micro_benchmarks(rows, cols))
+    for rows, cols in sizes:
+        print('search and perft %dx%d' % (rows, cols), flush=True)
+        timings, nodes = search_benchmarks(rows, cols)
+        results['timings'].update(timings)
+        results['nodes'].update(nodes)
+        # from a fixed mid-game position, so that wins and full columns occur within a few moves:
+        position = perft_position(rows, cols)
+        counts = [perft(position, depth) for depth in range(1, PERFT_DEPTH + 1)]
+        results['perft']['%dx%d' % (rows, cols)] = counts
+        check = perft_board(position.to_board(), PERFT_CHECK_DEPTH, position.turn)
+        if check != counts[PERFT_CHECK_DEPTH - 1]:
+            errors.append('perft %dx%d depth %d: %d on positions, %d on virtual boards'
+                          % (rows, cols, PERFT_CHECK_DEPTH, counts[PERFT_CHECK_DEPTH - 1], check))
+    return results, errors
+
+
+def compare(results, baseline, tolerance: float):
+    """
+    :return: list of regressions (slower timings, more nodes) and errors (perft differences) against 'baseline'
+    """
+    flagged = []
+    for name, timing in results['timings'].items():
+        old = baseline.get('timings', {}).get(name)
+        if old is not None and timing['median_us'] > old['median_us'] * (1 + tolerance):
+            flagged.append('slower: %s %.2f us -> %.2f us (%+.0f%%)' % (
+                name, old['median_us'], timing['median_us'], 100 * (timing['median_us'] / old['median_us'] - 1)))
+    for name, nodes in results['nodes'].items():
+        old = baseline.get('nodes', {}).get(name)
+        if old is not None and nodes > old:
+            flagged.append('more nodes: %s %d -> %d' % (name, old, nodes))
+    for size, counts in results['perft'].items():
+        old = baseline.get('perft', {}).get(size)
+        if old is not None and old[:len(counts)] != counts[:len(old)]:
+            flagged.append('perft %s: %s, baseline %s' % (size, counts, old))
+    return flagged
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the rules, evaluation and search.')
+    parser.add_argument('--output', default=RESULTS_FILE, help='results file (JSON)')
+    parser.add_argument('--baseline', default=BASELINE_FILE, help='results file to compare with (if it exists)')
+    parser.add_argument('--save-baseline', action='store_true', help='also save the results as the baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed slowdown (0.25: 25%%)')
+    parser.add_argument('--quick', action='store_true', help='search and perft on 4x4, 6x7 and 10x10 only')
+    args = parser.parse_args(argv)
+
+    results, flagged = run(MICRO_SIZES if args.quick else ALL_SIZES)
+    for name, timing in sorted(results['timings'].items()):
+        print('%-42s median %10.2f us   p95 %10.2f us' % (name, timing['median_us'], timing['p95_us']))
+    for name, nodes in sorted(results['nodes'].items()):
+        print('%-42s %d nodes' % (name, nodes))
+    with open(args.output, 'w') as file:
+        json.dump(results, file, indent=1, sort_keys=True)
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, 'r') as file:
+            flagged += compare(results, json.load(file), args.tolerance)
+    if args.save_baseline:
+        with open(args.baseline, 'w') as file:
+            json.dump(results, file, indent=1, sort_keys=True)
+    for line in flagged:
+        print('REGRESSION ' + line)
+    return 1 if flagged else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,37 @@
+"""
+Headless Connect-Four engine: rules, bitboard positions, evaluation and AI search.
+
+Nothing in this package reads files on import, opens a window or imports pygame/tkinter;
+board size, first player and difficulty are always passed explicitly.
+The pygame front-end (main.py) is built on top of it.
+"""
+import importlib
+
+from connect4.board import (GameState, Position, check_win, check_win_at, get_available_moves, is_game_over,
+                            next_free_row_on_col, print_board)
+from connect4.config import GameConfig, read_config
+from connect4.evaluation import IncrementalEvaluator, compute_score_reference, evaluate
+from connect4.batch import batch_evaluate, batch_game_over, batch_scores, batch_winners
+from connect4.stats import SearchStats, print_profile, profile_call
+from connect4.search import DIFFICULTIES, WIN_SCORE, Engine, SearchTimeout, make_engine
+from connect4.transposition import EXACT, LOWER, UPPER, TranspositionTable
+from connect4.parallel import ParallelSearch
+from connect4.background import BackgroundSearch
+
+# imported on first use (see __getattr__): the opening book, solver database and games log modules pull in sqlite3
+# and their file formats, and imported here they would be imported twice by 'python -m connect4.book' (or solver,
+# records), which warns
+LAZY_NAMES = {
+    'OpeningBook': 'connect4.book',
+    'Solver': 'connect4.solver',
+    'GameLog': 'connect4.records',
+    'GameRecord': 'connect4.records',
+    'read_games': 'connect4.records',
+    'replay': 'connect4.records',
+}
+
+
+def __getattr__(name: str):
+    if name in LAZY_NAMES:
+        return getattr(importlib.import_module(LAZY_NAMES[name]), name)
+    raise AttributeError('module %r has no attribute %r' % (__name__, name))
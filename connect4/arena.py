@@ -0,0 +1,243 @@
+"""
+Headless self-play arena: two engine configurations play each other on every board size, in a process pool.
+
+Usage: python -m connect4.arena [first] [second] [--games N] [--sizes 6x7,8x8] [--workers W] [--quiet]
+                                 [--record LOG]
+
+An engine configuration is a level of difficulty ('easy', 'medium', 'hard') or 'PLY[/BUDGET_MS]'
+(e.g. '5' or '7/500'). Each game is reported as soon as it ends; a table of wins, losses, draws,
+game lengths and time per move (median, p90, p99, max) per board size is printed at the end.
+With --record, every game is appended to a games log (see connect4.records).
+"""
+import argparse
+import os
+import random
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from connect4.board import GameState
+from connect4.config import MAX_SIZE, MIN_SIZE
+from connect4.records import GameLog
+from connect4.search import DIFFICULTIES, Engine
+
+# every board size the game supports:
+ALL_SIZES = tuple((rows, cols) for rows in range(MIN_SIZE, MAX_SIZE + 1) for cols in range(MIN_SIZE, MAX_SIZE + 1))
+# transposition table of an arena engine (emptied with the move ordering tables before every game, so games are
+# independent):
+ARENA_TT_MB = 4
+
+# engines of a worker process, by configuration:
+_worker_engines = {}
+
+
+def make_player(spec: str) -> Engine:
+    """
+    :param spec: level of difficulty ('easy', 'medium', 'hard') or 'PLY[/BUDGET_MS]'
+    :return: Engine for that configuration
+    """
+    if spec.lower() in DIFFICULTIES:
+        ply, time_budget_ms = DIFFICULTIES[spec.lower()]
+    else:
+        ply, _, budget = spec.partition('/')
+        ply, time_budget_ms = int(ply), int(budget) if budget else None
+    return Engine(ply, tt_memory_mb=ARENA_TT_MB, time_budget_ms=time_budget_ms)
+
+
+def play_game(first: Engine, second: Engine, rows: int, cols: int):
+    """
+    Function playing one game between two engines on an empty rows x cols board.
+
+    :param first: engine moving first
+    :param second: engine moving second
+    :return: (winner: 1 for first, 2 for second, 0 for a draw; number of moves; list of move times
+             in seconds of the first engine; same for the second; columns played)
+    """
+    game = GameState(rows, cols, 1)
+    engines = (None, first, second)
+    times = (None, [], [])
+    for engine in (first, second):
+        engine.new_game()
+    while not game.over:
+        player = game.turn
+        start = time.perf_counter()
+        col = engines[player].choose_move(game.position)
+        times[player].append(time.perf_counter() - start)
+        game.play(col)
+    return game.winner, game.moves, times[1], times[2], game.position.stack
+
+
+def _play_game_task(specs, rows, cols, swap, seed):
+    """
+    Task run by a worker process: one game between configurations specs[0] and specs[1].
+
+    :param swap: specs[1] moves first
+    :param seed: seed of the game (random moves and ties between equal moves)
+    :return: (rows, cols, swap, winner from specs[0]'s point of view (1 won, 2 lost, 0 draw),
+             number of moves, move times of specs[0], move times of specs[1], columns played)
+    """
+    random.seed(seed)
+    # (in self-play, each side gets its own engine, i.e. its own transposition table and move ordering)
+    keys = (specs[0], specs[1] if specs[1] != specs[0] else specs[1] + '#2')
+    for key, spec in zip(keys, specs):
+        if key not in _worker_engines:
+            _worker_engines[key] = make_player(spec)
+    engines = [_worker_engines[key] for key in keys]
+    if swap:
+        winner, moves, times_b, times_a, columns = play_game(engines[1], engines[0], rows, cols)
+        winner = (0, 2, 1)[winner]
+    else:
+        winner, moves, times_a, times_b, columns = play_game(engines[0], engines[1], rows, cols)
+    return rows, cols, swap, winner, moves, times_a, times_b, columns
+
+
+class Tally(object):
+    """
+    Class for the results of one pairing on one board size (from the first configuration's point of view).
+
+    Methods for:
+    - adding a game (or the games of another tally)
+    - distribution of the move times
+    - summary line
+    """
+
+    def __init__(self):
+        self.wins = self.losses = self.draws = 0
+        self.moves = []  # length of every game
+        self.times = ([], [])  # move times (in seconds) of each configuration
+
+    @property
+    def games(self) -> int:
+        return self.wins + self.losses + self.draws
+
+    def add(self, winner, moves, times_a, times_b):
+        if winner == 1:
+            self.wins += 1
+        elif winner == 2:
+            self.losses += 1
+        else:
+            self.draws += 1
+        self.moves.append(moves)
+        self.times[0].extend(times_a)
+        self.times[1].extend(times_b)
+
+    def merge(self, other):
+        self.wins += other.wins
+        self.losses += other.losses
+        self.draws += other.draws
+        self.moves.extend(other.moves)
+        self.times[0].extend(other.times[0])
+        self.times[1].extend(other.times[1])
+
+    @staticmethod
+    def distribution(times) -> str:
+        """
+        :param times: move times in seconds
+        :return: 'median/p90/p99/max' in milliseconds
+        """
+        if not times:
+            return '-'
+        times = sorted(times)
+
+        def percentile(p):
+            return times[min(len(times) - 1, int(p * len(times)))] * 1000
+
+        return '%.1f/%.1f/%.1f/%.1f' % (statistics.median(times) * 1000, percentile(0.9), percentile(0.99),
+                                        times[-1] * 1000)
+
+    def summary(self) -> str:
+        return '+%d -%d =%d  moves %.1f  ms/move (med/p90/p99/max) %s | %s' % (
+            self.wins, self.losses, self.draws, statistics.mean(self.moves), self.distribution(self.times[0]),
+            self.distribution(self.times[1]))
+
+
+class Arena(object):
+    """
+    Class for a match between two engine configurations.
+
+    Methods for:
+    - initialization (configurations, games per board size, board sizes, workers, games log)
+    - playing the games in a process pool, yielding results as they come in
+    - final report
+    """
+
+    def __init__(self, first: str, second: str, games: int = 10, sizes=ALL_SIZES, workers: int = None,
+                 seed: int = 0, record: str = None):
+        self.specs = (first, second)
+        self.games = games  # per board size; who moves first alternates between games
+        self.sizes = tuple(sizes)
+        self.workers = workers or os.cpu_count() or 1
+        self.seed = seed
+        self.tallies = {size: Tally() for size in self.sizes}
+        self.record = record  # games log the games are appended to (None: not recorded)
+
+    def run(self):
+        """
+        Play every game; results are added to self.tallies and yielded as soon as each game ends.
+
+        :return: generator of (rows, cols, swap, winner, moves, times_a, times_b, columns) (see _play_game_task)
+        """
+        log = GameLog(self.record) if self.record is not None else None
+        try:
+            with ProcessPoolExecutor(self.workers) as pool:
+                futures = [pool.submit(_play_game_task, self.specs, rows, cols, game % 2 == 1,
+                                       hash((self.seed, rows, cols, game)))
+                           for game in range(self.games) for rows, cols in self.sizes]
+                for future in as_completed(futures):
+                    result = future.result()
+                    rows, cols, swap, winner, moves, times_a, times_b, columns = result
+                    self.tallies[(rows, cols)].add(winner, moves, times_a, times_b)
+                    if log is not None:
+                        # (in the log, player 1 moved first and the winner is a board value)
+                        log.append(rows, cols, 1, (0, 2, 1)[winner] if swap else winner, columns)
+                    yield result
+        finally:
+            if log is not None:
+                log.close()
+
+    def report(self) -> str:
+        lines = ['%s vs %s (wins/losses/draws of %s)' % (self.specs[0], self.specs[1], self.specs[0])]
+        total = Tally()
+        for (rows, cols), tally in sorted(self.tallies.items()):
+            if tally.games:
+                lines.append('%2dx%-2d %s' % (rows, cols, tally.summary()))
+                total.merge(tally)
+        if total.games:
+            lines.append('total %s' % total.summary())
+        return '\n'.join(lines)
+
+
+def parse_sizes(text: str):
+    """
+    :param text: comma-separated board sizes ('6x7,8x8') or 'all'
+    :return: tuple of (rows, cols)
+    """
+    if text == 'all':
+        return ALL_SIZES
+    return tuple(tuple(int(n) for n in size.split('x')) for size in text.split(','))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Play two engine configurations against each other.')
+    parser.add_argument('first', nargs='?', default='medium')
+    parser.add_argument('second', nargs='?', default='hard')
+    parser.add_argument('--games', type=int, default=10, help='games per board size')
+    parser.add_argument('--sizes', type=parse_sizes, default=ALL_SIZES, help="e.g. '6x7,8x8' (default: all)")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--quiet', action='store_true', help='only print the final report')
+    parser.add_argument('--record', default=None, help='append the games to this games log')
+    args = parser.parse_args(argv)
+
+    arena = Arena(args.first, args.second, args.games, args.sizes, args.workers, args.seed, args.record)
+    total = args.games * len(arena.sizes)
+    for done, (rows, cols, swap, winner, moves, _, _, _) in enumerate(arena.run(), 1):
+        if not args.quiet:
+            outcome = ('draw', arena.specs[0] + ' wins', arena.specs[1] + ' wins')[winner]
+            print('[%d/%d] %dx%d, %s first: %s in %d moves'
+                  % (done, total, rows, cols, arena.specs[swap], outcome, moves), flush=True)
+    print(arena.report())
+
+
+if __name__ == '__main__':
+    main()
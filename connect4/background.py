@@ -0,0 +1,204 @@
+"""
+Background AI search: the engine runs in a process of its own, so the GUI keeps handling its events
+while the AI thinks (and the search doesn't share the GUI's GIL).
+
+Searches are numbered. The worker reports on a queue, and every message is a tuple
+(kind, search id, column, score, stats):
+- 'depth': a depth was completed; column and score are the best move so far
+- 'done': the search finished, and column is the move to play
+- 'cancelled': the search was cancelled (column and score are None)
+
+While the opponent thinks, the worker can ponder: it searches the position after each of the opponent's
+replies (the likeliest first) and keeps the answers. If the opponent then plays one of the pondered replies,
+the answer comes back at once; otherwise the search starts from the transposition table warmed up by pondering.
+Pondering sends no messages.
+"""
+import multiprocessing
+import threading
+
+from connect4.board import center_order
+from connect4.search import PLAYER_KEYS, SearchTimeout
+
+
+def _ponder(engine, position, is_cancelled, answers):
+    """
+    Search the position after each reply of the player to move in 'position', until cancelled.
+
+    :param is_cancelled: function returning True once pondering must stop
+    :param answers: {position hash: (column, score, stats)}, filled with the answer to each reply
+    :return: -
+    """
+    # the reply the last search expected first (best move stored in the transposition table), then center-out:
+    # (stored by the last search, where the opponent of the player to move maximized: see PLAYER_KEYS)
+    entry = engine.tt.probe(position.hash ^ PLAYER_KEYS[3 - position.turn])
+    replies = center_order(position.cols)
+    if entry is not None and entry[3] is not None:
+        replies = [entry[3]] + [col for col in replies if col != entry[3]]
+    # (one age of the transposition table for the whole ponder task, not one per reply)
+    engine.tt.new_search()
+    for col in replies:
+        if not position.can_play(col) or position.is_winning_move(col):
+            continue
+        reply = position.copy()
+        reply.play(col)
+        if reply.is_full():
+            continue
+        try:
+            column, score, stats = engine.search(reply, new_search=False)
+        except SearchTimeout:
+            return
+        # (a search stopped after its first depth returns normally, with a shallower move)
+        if is_cancelled():
+            return
+        answers[reply.hash] = (column, score, stats)
+
+
+def _background_worker(factory, args, tasks, messages, cancelled):
+    """
+    Process running the searches: builds its engine with factory(*args), then runs the tasks
+    (kind 'search' or 'ponder', search id, position) until None comes in.
+
+    :param cancelled: shared value, the searches numbered up to it are cancelled
+    """
+    engine = factory(*args)
+    answers = {}  # answers found by the last pondering
+    for task in iter(tasks.get, None):
+        kind, search_id, position = task
+        if cancelled.value >= search_id:
+            if kind == 'search':
+                messages.put(('cancelled', search_id, None, None, None))
+            continue
+        engine.stop = lambda: cancelled.value >= search_id
+        if kind == 'ponder':
+            answers = {}
+            try:
+                _ponder(engine, position, engine.stop, answers)
+            finally:
+                engine.stop = None
+            continue
+        if position.hash in answers:
+            column, score, stats = answers.pop(position.hash)
+            stats.pondered = True
+            engine.stop = None
+            messages.put(('done', search_id, column, score, stats))
+            continue
+        engine.on_depth = lambda stats: messages.put(('depth', search_id, stats.column, stats.score, stats))
+        try:
+            column, score, stats = engine.search(position)
+        except SearchTimeout:
+            column, score, stats = None, None, engine.stats
+        finally:
+            engine.stop = engine.on_depth = None
+        if cancelled.value >= search_id:
+            messages.put(('cancelled', search_id, None, None, stats))
+        else:
+            messages.put(('done', search_id, column, score, stats))
+    messages.put(None)
+
+
+class BackgroundSearch(object):
+    """
+    Class for an engine searching in a background process (one search at a time).
+
+    Methods for:
+    - initialization (the engine is built by the worker process) and shutdown of the worker
+    - starting a search (or pondering), and cancelling it
+    - receiving progress and results (callback, or waiting for the result)
+    """
+
+    def __init__(self, factory, *args, on_message=None):
+        """
+        :param factory: function building the engine in the worker (with the 'spawn' start method it must be
+                        importable, e.g. a module-level function)
+        :param args: arguments of factory
+        :param on_message: function called with each message of the current search, from a thread of this process
+                           (e.g. to post it to the GUI's event queue)
+        """
+        self.on_message = on_message
+        self.tasks = multiprocessing.Queue()
+        self.messages = multiprocessing.Queue()
+        self.cancelled = multiprocessing.RawValue('q', 0)
+        self.search_id = 0  # id of the last search started
+        self.result = None  # last 'done' or 'cancelled' message of the current search
+        self.finished = threading.Event()
+        self.finished.set()
+        self.process = multiprocessing.Process(target=_background_worker, daemon=True,
+                                               args=(factory, args, self.tasks, self.messages, self.cancelled))
+        self.process.start()
+        self.reader = threading.Thread(target=self._read_messages, daemon=True)
+        self.reader.start()
+
+    def _read_messages(self):
+        for message in iter(self.messages.get, None):
+            # messages of earlier (cancelled) searches are dropped:
+            if message[1] != self.search_id:
+                continue
+            if message[0] != 'depth':
+                self.result = message
+                self.finished.set()
+            if self.on_message is not None:
+                self.on_message(message)
+
+    def start(self, position) -> int:
+        """
+        Start searching 'position' (the running search, if any, is cancelled).
+
+        :param position: bitboard position (Position), engine to move
+        :return: id of the search (in its messages)
+        """
+        self.cancel()
+        self.search_id += 1
+        self.result = None
+        self.finished.clear()
+        self.tasks.put(('search', self.search_id, position))
+        return self.search_id
+
+    def ponder(self, position):
+        """
+        Ponder on the opponent's time (the running search, if any, is cancelled): the answer to each reply
+        of the opponent is searched in advance. The next start() cancels pondering.
+
+        :param position: bitboard position (Position), opponent to move
+        :return: -
+        """
+        self.cancel()
+        self.search_id += 1
+        self.tasks.put(('ponder', self.search_id, position))
+
+    def cancel(self):
+        """
+        Cancel the current search: the worker stops within a few hundred nodes, and the search's messages
+        end with 'cancelled' (later messages of the search are dropped).
+        """
+        self.cancelled.value = self.search_id
+
+    @property
+    def busy(self) -> bool:
+        return not self.finished.is_set()
+
+    def wait(self, timeout: float = None):
+        """
+        :return: last message of the current search ('done' or 'cancelled'), None if it is still running
+                 after 'timeout' seconds
+        """
+        self.finished.wait(timeout)
+        return self.result
+
+    def close(self):
+        """
+        Cancel the current search and stop the worker process.
+        """
+        self.cancel()
+        self.tasks.put(None)
+        self.process.join(5)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+            self.messages.put(None)
+        self.reader.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,518 @@
+"""
+Rules of Connect-Four: board geometry, the bitboard Position used by the search, the GameState of a game
+and helpers working on virtual boards (2D arrays, row 0 at the top, 0 free / 1 player 1 / 2 player 2).
+"""
+import random
+
+import numpy as np
+
+
+"""_______________________ VIRTUAL BOARD FUNCTIONS __________________ """
+
+
+# get next free row on column col (-1 if column is full):
+def next_free_row_on_col(board, column):
+    last = -1
+    for i in range(len(board)):
+        if board[i][column] == 0:
+            last = i
+    return last
+
+
+# remaining available moves (columns):
+def get_available_moves(board):
+    return [col_count for col_count in range(len(board[0])) if board[0][col_count] == 0]
+
+
+def check_win(board, value: int) -> bool:
+    """
+    Function that checks whether the player with board value 'value' has 4 pieces in a row.
+
+    :param board: virtual board
+    :param value: board value of the player (1 or 2)
+    :return: boolean value (true if the player wins, false otherwise)
+    """
+    rows, cols = len(board), len(board[0])
+    flat = np.asarray(board).ravel()
+    for a, b, c, d in board_windows(rows, cols)[0]:
+        if flat[a] == flat[b] == flat[c] == flat[d] == value:
+            return True
+    return False
+
+
+# game is over when one player wins (or when table is full):
+def is_game_over(board) -> bool:
+    return check_win(board, 1) or check_win(board, 2) or not get_available_moves(board)
+
+
+# printing board in terminal:
+def print_board(board):
+    rows, cols = len(board), len(board[0])
+    for i in range(rows):
+        for j in range(cols):
+            if j < cols - 1:
+                print(int(board[i][j]), end='|')
+            else:
+                print(int(board[i][j]))
+    print('\n')
+
+
+# windows of 4 aligned cells, one table per board size:
+_WINDOWS = {}
+
+
+def board_windows(rows: int, cols: int):
+    """
+    Function listing (once per board size) all the windows of 4 aligned cells
+    (horizontal, vertical and both diagonals) and, for every cell, the windows through it.
+
+    Cells are numbered row * cols + col (row 0 is the top row, like on GameBoard.board).
+
+    :param rows: number of rows on the board
+    :param cols: number of columns on the board
+    :return: (windows, cell_windows, bit_window_masks) where
+             windows[w] is the tuple of the 4 cells of window w,
+             cell_windows[cell] is the list of windows through 'cell',
+             bit_window_masks[bit] is the list of bitboard masks of the windows through bitboard cell 'bit'
+    """
+    key = (rows, cols)
+    if key not in _WINDOWS:
+        windows = []
+        for d_row, d_col in ((0, 1), (1, 0), (1, 1), (1, -1)):
+            for row in range(rows):
+                for col in range(cols):
+                    end_row, end_col = row + 3 * d_row, col + 3 * d_col
+                    if 0 <= end_row < rows and 0 <= end_col < cols:
+                        windows.append(tuple((row + i * d_row) * cols + col + i * d_col for i in range(4)))
+        cell_windows = [[] for _ in range(rows * cols)]
+        bit_window_masks = [[] for _ in range(cols * (rows + 1))]
+        for w, window in enumerate(windows):
+            mask = 0
+            for cell in window:
+                mask |= 1 << cell_to_bit(cell, rows, cols)
+            for cell in window:
+                cell_windows[cell].append(w)
+                bit_window_masks[cell_to_bit(cell, rows, cols)].append(mask)
+        _WINDOWS[key] = (windows, cell_windows, bit_window_masks)
+    return _WINDOWS[key]
+
+
+def cell_to_bit(cell: int, rows: int, cols: int) -> int:
+    """
+    :return: bitboard index (see Position) of cell row * cols + col
+    """
+    row, col = divmod(cell, cols)
+    return col * (rows + 1) + rows - 1 - row
+
+
+def check_win_at(board, row: int, col: int) -> int:
+    """
+    Function checking whether the piece at (row, col) (normally the last dropped one) completes 4 in a row.
+    Only the windows through that cell are examined.
+
+    :param board: virtual board
+    :param row: row of the piece
+    :param col: column of the piece
+    :return: board value of the winner (1 or 2), 0 if the piece doesn't win
+    """
+    rows, cols = len(board), len(board[0])
+    value = int(board[row][col])
+    if value == 0:
+        return 0
+    windows, cell_windows, _ = board_windows(rows, cols)
+    flat = np.asarray(board).ravel()
+    for w in cell_windows[row * cols + col]:
+        a, b, c, d = windows[w]
+        if flat[a] == flat[b] == flat[c] == flat[d]:
+            return value
+    return 0
+
+
+"""_______________________ BITBOARD POSITION __________________ """
+
+# geometry (masks and column tops) shared by all positions of the same board size:
+_GEOMETRY = {}
+
+
+def board_geometry(rows: int, cols: int):
+    """
+    Function computing (once per board size) the constant masks used by Position.
+
+    Every column takes rows + 1 bits: 'rows' bits for the cells (from bottom to top)
+    and one empty sentinel bit on top, so that shifted masks never wrap into the next column.
+
+    :param rows: number of rows on the board
+    :param cols: number of columns on the board
+    :return: (bottom_mask, board_mask, tops) where tops[col] is the bit index of the sentinel bit of 'col'
+    """
+    key = (rows, cols)
+    if key not in _GEOMETRY:
+        height = rows + 1
+        bottom_mask = 0
+        for col in range(cols):
+            bottom_mask |= 1 << (col * height)
+        board_mask = bottom_mask * ((1 << rows) - 1)
+        tops = tuple(col * height + rows for col in range(cols))
+        _GEOMETRY[key] = (bottom_mask, board_mask, tops)
+    return _GEOMETRY[key]
+
+
+# center-out column orders, one per board width:
+_CENTER_ORDER = {}
+
+
+def center_order(cols: int):
+    """
+    :param cols: number of columns on the board
+    :return: tuple of all columns, from the center column outwards (center columns are part of more lines)
+    """
+    if cols not in _CENTER_ORDER:
+        _CENTER_ORDER[cols] = tuple(sorted(range(cols), key=lambda col: abs(2 * col - (cols - 1))))
+    return _CENTER_ORDER[cols]
+
+
+# Zobrist keys shared by all positions of the same board size:
+_ZOBRIST = {}
+
+
+def zobrist_keys(rows: int, cols: int):
+    """
+    Function generating (once per board size) the random 64-bit Zobrist keys used to hash positions.
+
+    The generator is seeded with the board size, so the keys (and hashes) are the same in every process.
+
+    :param rows: number of rows on the board
+    :param cols: number of columns on the board
+    :return: (keys, side_key) where keys[player][bit] is the key of a 'player' piece on bitboard cell 'bit'
+    """
+    key = (rows, cols)
+    if key not in _ZOBRIST:
+        generator = random.Random(rows * 100 + cols)
+        cells = cols * (rows + 1)
+        keys = ([0] * cells,
+                [generator.getrandbits(64) for _ in range(cells)],
+                [generator.getrandbits(64) for _ in range(cells)])
+        side_key = generator.getrandbits(64)
+        _ZOBRIST[key] = (keys, side_key)
+    return _ZOBRIST[key]
+
+
+# bit of each bitboard index (up to 10 columns of 11 bits), looked up on every drop instead of being built:
+BITS = tuple(1 << index for index in range(10 * 11))
+
+
+def line_spots(pieces: int, height: int) -> int:
+    """
+    Function computing with shifts the bits that complete 4 in a row with 3 pieces of 'pieces'
+    (occupied, free or off the board: mask the result).
+
+    :param pieces: bitboard of the player's pieces
+    :param height: bits per column (rows + 1)
+    :return: bitboard
+    """
+    # vertical:
+    spots = (pieces << 1) & (pieces << 2) & (pieces << 3)
+    # horizontal and both diagonals (the missing piece is at either end or inside the line):
+    for shift in (height, height - 1, height + 1):
+        left = pieces << shift
+        right = pieces >> shift
+        spots |= left & (pieces << 2 * shift) & ((pieces << 3 * shift) | right)
+        spots |= right & (pieces >> 2 * shift) & (left | (pieces >> 3 * shift))
+    return spots
+
+
+def winning_spots(pieces: int, mask: int, rows: int, cols: int) -> int:
+    """
+    Function computing the free cells that would complete 4 in a row for a player (playable or not).
+
+    :param pieces: bitboard of the player's pieces
+    :param mask: bitboard of all pieces
+    :return: bitboard of the winning cells
+    """
+    return line_spots(pieces, rows + 1) & (board_geometry(rows, cols)[1] ^ mask)
+
+
+def has_four(mask: int, height: int) -> bool:
+    """
+    Function checking with shifts whether a bitboard mask contains 4 aligned pieces.
+
+    :param mask: bitboard of one player's pieces
+    :param height: bits per column (rows + 1)
+    :return: bool
+    """
+    # vertical, horizontal and both diagonal directions:
+    for shift in (1, height, height - 1, height + 1):
+        pairs = mask & (mask >> shift)
+        if pairs & (pairs >> (2 * shift)):
+            return True
+    return False
+
+
+class Position(object):
+    """
+    Class for bitboard representation of the game board, used by the AI search.
+
+    Bit (col * (rows + 1) + h) is the cell 'h' rows above the bottom of column 'col'.
+    masks[1] holds the pieces of player 1 (human), masks[2] the pieces of player 2 (computer)
+    and masks[0] all occupied cells; heights[col] is the bit index of the next free cell of 'col'.
+    'hash' is the Zobrist hash of the position, updated incrementally on every drop,
+    and 'cells' holds the board values (0, 1 or 2) cell by cell, row 0 first, for the evaluation.
+    'stack' holds the columns played since the position was built, so moves can be taken back (undo).
+
+    Methods for:
+    - initialization and conversion from/to the virtual board (GameBoard.board)
+    - legal move generation
+    - dropping a piece and taking it back
+    - four-in-a-row detection and threats (tactical pre-check of the search)
+    """
+    __slots__ = ('rows', 'cols', 'masks', 'heights', 'turn', 'moves', 'hash', 'cells', 'stack')
+
+    def __init__(self, rows: int, cols: int, turn: int = 1):
+        self.rows = rows
+        self.cols = cols
+        self.masks = [0, 0, 0]
+        self.heights = [col * (self.rows + 1) for col in range(self.cols)]
+        self.turn = turn  # player to move (1 for human, 2 for computer)
+        self.moves = 0  # number of pieces on the board
+        self.hash = zobrist_keys(self.rows, self.cols)[1] if turn == 2 else 0
+        self.cells = bytearray(self.rows * self.cols)
+        self.stack = []
+
+    @classmethod
+    def from_board(cls, board, turn: int):
+        """
+        Build the bitboard position of a virtual board (row 0 is the top row).
+
+        :param board: virtual board (GameBoard.board)
+        :param turn: player to move (1 or 2)
+        :return: Position
+        """
+        rows, cols = len(board), len(board[0])
+        position = cls(rows, cols, turn)
+        keys = zobrist_keys(rows, cols)[0]
+        for col in range(cols):
+            for row in range(rows - 1, -1, -1):
+                value = int(board[row][col])
+                if value == 0:
+                    break
+                bit = 1 << position.heights[col]
+                position.masks[value] |= bit
+                position.masks[0] |= bit
+                position.hash ^= keys[value][position.heights[col]]
+                position.cells[row * cols + col] = value
+                position.heights[col] += 1
+                position.moves += 1
+        return position
+
+    def to_board(self):
+        """
+        :return: virtual board (same layout as GameBoard.board) of the position
+        """
+        return np.frombuffer(self.cells, dtype=np.int8).reshape(self.rows, self.cols).astype(float)
+
+    def copy(self):
+        position = Position.__new__(Position)
+        position.rows, position.cols = self.rows, self.cols
+        position.masks = self.masks[:]
+        position.heights = self.heights[:]
+        position.turn = self.turn
+        position.moves = self.moves
+        position.hash = self.hash
+        position.cells = self.cells[:]
+        position.stack = self.stack[:]
+        return position
+
+    # is there room left on column col?
+    def can_play(self, col: int) -> bool:
+        return self.heights[col] != board_geometry(self.rows, self.cols)[2][col]
+
+    # bitmask of the cells where a piece can be dropped now:
+    def possible_moves(self) -> int:
+        bottom_mask, board_mask, _ = board_geometry(self.rows, self.cols)
+        return (self.masks[0] + bottom_mask) & board_mask
+
+    # remaining available moves (columns):
+    def legal_moves(self):
+        tops = board_geometry(self.rows, self.cols)[2]
+        heights = self.heights
+        return [col for col in range(self.cols) if heights[col] != tops[col]]
+
+    # drop piece of the player to move on column col (returns the cell row * cols + col of the piece):
+    def play(self, col: int) -> int:
+        index = self.heights[col]
+        bit = BITS[index]
+        self.masks[self.turn] |= bit
+        self.masks[0] |= bit
+        keys, side_key = zobrist_keys(self.rows, self.cols)
+        self.hash ^= keys[self.turn][index] ^ side_key
+        cell = (self.rows - 1 - index + col * (self.rows + 1)) * self.cols + col
+        self.cells[cell] = self.turn
+        self.heights[col] += 1
+        self.turn = 3 - self.turn
+        self.moves += 1
+        self.stack.append(col)
+        return cell
+
+    # take back the last move (returns the cell row * cols + col that was freed):
+    def undo(self) -> int:
+        col = self.stack.pop()
+        self.heights[col] -= 1
+        index = self.heights[col]
+        bit = BITS[index]
+        self.turn = 3 - self.turn
+        self.masks[self.turn] ^= bit
+        self.masks[0] ^= bit
+        keys, side_key = zobrist_keys(self.rows, self.cols)
+        self.hash ^= keys[self.turn][index] ^ side_key
+        cell = (self.rows - 1 - index + col * (self.rows + 1)) * self.cols + col
+        self.cells[cell] = 0
+        self.moves -= 1
+        return cell
+
+    # would dropping a piece on column col win the game for the player to move?
+    # (only the windows through the dropped cell are examined)
+    def is_winning_move(self, col: int) -> bool:
+        index = self.heights[col]
+        mask = self.masks[self.turn] | BITS[index]
+        for window in board_windows(self.rows, self.cols)[2][index]:
+            if mask & window == window:
+                return True
+        return False
+
+    def threats(self):
+        """
+        Tactical pre-check of the position: the cells completing 4 in a row of both players, found at once
+        for every window with shifts of the bitboards (see line_spots).
+
+        :return: (cells where the player to move wins now, cells where the opponent would win next move
+                 (to be blocked), cells right below a cell where the opponent would win (a piece there lets
+                 the opponent win on top of it)), as bitmasks of playable cells (see column_of)
+        """
+        bottom_mask, board_mask, _ = board_geometry(self.rows, self.cols)
+        mask = self.masks[0]
+        possible = (mask + bottom_mask) & board_mask
+        height = self.rows + 1
+        opponent_spots = line_spots(self.masks[3 - self.turn], height) & (board_mask ^ mask)
+        return (possible & line_spots(self.masks[self.turn], height), possible & opponent_spots,
+                possible & (opponent_spots >> 1))
+
+    # column of the lowest cell of a non-empty bitmask (e.g. of threats()):
+    def column_of(self, cells: int) -> int:
+        return ((cells & -cells).bit_length() - 1) // (self.rows + 1)
+
+    def has_won(self, player: int) -> bool:
+        return has_four(self.masks[player], self.rows + 1)
+
+    def is_full(self) -> bool:
+        return self.moves == self.rows * self.cols
+
+
+class GameState(object):
+    """
+    Class for the state of one game: the position (board, side to move, move count, column heights)
+    and the result. The GUI, the arena and the server each play their games on one GameState.
+
+    A state only holds a Position (a few ints, a bytearray of the cells and the list of moves) and the
+    result, no NumPy array and nothing of the front-end, so that many games can be kept in one process:
+    about 0.5 KB per new 6x7 game and 0.85 KB once the game is under way (tracemalloc, 10 000 games),
+    against 0.47 KB for the float array of the board alone.
+
+    Methods for:
+    - initialization (board size, first player) and copy
+    - legal moves, playing a move (winner detection) and taking it back
+    - result, free cells and pieces of each player
+    - virtual board view of the cells (for display)
+    """
+    __slots__ = ('position', 'first_player', 'winner')
+
+    def __init__(self, rows: int, cols: int, first_player: int = 1):
+        self.position = Position(rows, cols, first_player)
+        self.first_player = first_player  # board value of the player who moved first (1 or 2)
+        self.winner = 0  # 1 or 2 once a player has 4 in a row, 0 otherwise (a draw once the board is full)
+
+    def __repr__(self):
+        return 'GameState(%dx%d, %d moves, turn %d, winner %d)' % (self.rows, self.cols, self.moves, self.turn,
+                                                                   self.winner)
+
+    def copy(self):
+        state = GameState.__new__(GameState)
+        state.position = self.position.copy()
+        state.first_player = self.first_player
+        state.winner = self.winner
+        return state
+
+    @property
+    def rows(self) -> int:
+        return self.position.rows
+
+    @property
+    def cols(self) -> int:
+        return self.position.cols
+
+    # player to move (1 or 2):
+    @property
+    def turn(self) -> int:
+        return self.position.turn
+
+    # number of pieces on the board:
+    @property
+    def moves(self) -> int:
+        return self.position.moves
+
+    @property
+    def free_cells(self) -> int:
+        return self.rows * self.cols - self.position.moves
+
+    # the game is over when one player wins (or when the board is full):
+    @property
+    def over(self) -> bool:
+        return self.winner != 0 or self.position.is_full()
+
+    # number of pieces of player (1 or 2) on the board:
+    def pieces(self, player: int) -> int:
+        return bin(self.position.masks[player]).count('1')
+
+    # can a piece be dropped on column col now?
+    def can_play(self, col: int) -> bool:
+        return not self.over and 0 <= col < self.cols and self.position.can_play(col)
+
+    # remaining available moves (columns; none once the game is over):
+    def legal_moves(self):
+        return [] if self.winner else self.position.legal_moves()
+
+    # get next free row on column col (-1 if column is full), row 0 at the top:
+    def next_free_row(self, col: int) -> int:
+        height = self.position.heights[col] - col * (self.rows + 1)
+        return self.rows - 1 - height if height < self.rows else -1
+
+    def play(self, col: int) -> int:
+        """
+        Drop a piece of the player to move on column col.
+
+        :return: row the piece landed on (row 0 at the top)
+        """
+        if not self.can_play(col):
+            raise ValueError('%r: illegal move %r' % (self, col))
+        if self.position.is_winning_move(col):
+            self.winner = self.position.turn
+        return self.position.play(col) // self.cols
+
+    def undo(self) -> int:
+        """
+        Take back the last move (in place, like Position.undo).
+
+        :return: column of the move
+        """
+        col = self.position.stack[-1]
+        self.position.undo()
+        self.winner = 0  # (no move is played once a player has won)
+        return col
+
+    @property
+    def board(self) -> np.ndarray:
+        """
+        :return: read-only (rows, cols) int8 view of the cells (virtual board layout, not copied)
+        """
+        board = np.frombuffer(self.position.cells, dtype=np.int8).reshape(self.rows, self.cols)
+        board.flags.writeable = False
+        return board
@@ -0,0 +1,199 @@
+"""
+Opening book: best moves of the first positions of a game, precomputed per board size.
+
+A book file holds a header and fixed-size records (Zobrist hash of the position, best column, score)
+sorted by hash. At run time the file is memory-mapped and searched by bisection, so opening a book
+loads nothing up front and a lookup reads a few records.
+
+Usage (generator): python -m connect4.book [--sizes 6x7,5x5|all] [--plies 4] [--depth 8] [--workers W]
+"""
+import argparse
+import mmap
+import os
+import struct
+from concurrent.futures import ProcessPoolExecutor
+
+from connect4.board import Position
+from connect4.config import MAX_SIZE, MIN_SIZE
+from connect4.search import Engine
+
+# directory of the book files (one per board size):
+BOOK_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'books')
+# book files: magic, version, rows, cols, plies covered, number of records; then the sorted records
+BOOK_MAGIC = b'C4OB'
+BOOK_VERSION = 1
+HEADER = struct.Struct('<4sBBBBI')
+RECORD = struct.Struct('<QBq')  # position hash, best column, score (for the player to move)
+KEY = struct.Struct('<Q')
+# default generator settings: positions with fewer than BOOK_PLIES pieces, searched to BOOK_DEPTH
+BOOK_PLIES = 4
+BOOK_DEPTH = 8
+
+
+def book_path(rows: int, cols: int, directory: str = BOOK_DIR) -> str:
+    return os.path.join(directory, 'book_%dx%d.bin' % (rows, cols))
+
+
+class OpeningBook(object):
+    """
+    Class for a read-only, memory-mapped opening book of one board size.
+
+    Methods for:
+    - opening a book file (or the book of a board size, if there is one) and closing it
+    - looking a position up (binary search on the position hash)
+    """
+
+    def __init__(self, path: str):
+        with open(path, 'rb') as file:
+            self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.rows, self.cols, self.plies, self.count = HEADER.unpack_from(self.data, 0)
+        if magic != BOOK_MAGIC or version != BOOK_VERSION:
+            self.data.close()
+            raise ValueError('%s is not an opening book (version %d)' % (path, BOOK_VERSION))
+        if len(self.data) != HEADER.size + self.count * RECORD.size:
+            self.data.close()
+            raise ValueError('%s is truncated' % path)
+
+    @classmethod
+    def for_size(cls, rows: int, cols: int, directory: str = BOOK_DIR):
+        """
+        :return: OpeningBook of the rows x cols board, None if there is no book for that size
+        """
+        path = book_path(rows, cols, directory)
+        return cls(path) if os.path.exists(path) else None
+
+    def close(self):
+        self.data.close()
+
+    def __len__(self):
+        return self.count
+
+    def lookup(self, position):
+        """
+        :param position: bitboard position (Position) of the book's board size
+        :return: (column, score) for the player to move, or None if the position is not in the book
+        """
+        if position.moves >= self.plies or (position.rows, position.cols) != (self.rows, self.cols):
+            return None
+        key = position.hash
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if KEY.unpack_from(self.data, HEADER.size + middle * RECORD.size)[0] < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.count:
+            found, column, score = RECORD.unpack_from(self.data, HEADER.size + low * RECORD.size)
+            if found == key and position.can_play(column):
+                return column, score
+        return None
+
+
+"""_______________________ BOOK GENERATOR __________________ """
+
+# search engine of a generator process:
+_book_engine = None
+
+
+def book_positions(rows: int, cols: int, plies: int):
+    """
+    :return: {hash: Position} of every position with fewer than 'plies' pieces reached without a win,
+             whoever moved first
+    """
+    positions = {}
+
+    def visit(position):
+        if position.hash in positions:
+            return
+        positions[position.hash] = position.copy()
+        if position.moves + 1 >= plies:
+            return
+        for col in position.legal_moves():
+            if not position.is_winning_move(col):
+                position.play(col)
+                visit(position)
+                position.undo()
+
+    for first in (1, 2):
+        visit(Position(rows, cols, first))
+    return positions
+
+
+def mirror(position):
+    """
+    :param position: Position built by playing moves from an empty board
+    :return: the same position with the columns in reverse order
+    """
+    first = position.turn if position.moves % 2 == 0 else 3 - position.turn
+    mirrored = Position(position.rows, position.cols, first)
+    for col in position.stack:
+        mirrored.play(position.cols - 1 - col)
+    return mirrored
+
+
+def _search_book_position(position, depth):
+    global _book_engine
+    if _book_engine is None or _book_engine.ply != depth:
+        _book_engine = Engine(depth, random_ties=False)
+    # every position from an empty table, so the book doesn't depend on how positions were shared out:
+    _book_engine.tt.clear()
+    column, score, _ = _book_engine.search(position, None, depth)
+    return position.hash, column, score
+
+
+def write_book(rows: int, cols: int, plies: int = BOOK_PLIES, depth: int = BOOK_DEPTH, workers: int = None,
+               directory: str = BOOK_DIR) -> str:
+    """
+    Function searching every book position of the rows x cols board to 'depth' and writing the book file.
+
+    :return: path of the book file
+    """
+    # only one position of each mirrored pair is searched (with an even number of columns,
+    # the evaluation's center column has no mirror image, so every position is searched):
+    positions, mirrors = [], {}
+    for key, position in book_positions(rows, cols, plies).items():
+        if cols % 2 == 0:
+            positions.append(position)
+        elif key not in mirrors:
+            mirrored = mirror(position)
+            mirrors[mirrored.hash] = key
+            positions.append(position)
+    with ProcessPoolExecutor(workers) as pool:
+        records = set(pool.map(_search_book_position, positions, [depth] * len(positions), chunksize=8))
+    by_key = {key: (column, score) for key, column, score in records}
+    for mirrored_key, key in mirrors.items():
+        if mirrored_key != key:
+            column, score = by_key[key]
+            records.add((mirrored_key, cols - 1 - column, score))
+    records = sorted(records)
+    os.makedirs(directory, exist_ok=True)
+    path = book_path(rows, cols, directory)
+    with open(path, 'wb') as file:
+        file.write(HEADER.pack(BOOK_MAGIC, BOOK_VERSION, rows, cols, plies, len(records)))
+        for record in records:
+            file.write(RECORD.pack(*record))
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Generate the opening books.')
+    parser.add_argument('--sizes', default='6x7', help="board sizes, e.g. '6x7,5x5', or 'all'")
+    parser.add_argument('--plies', type=int, default=BOOK_PLIES, help='book positions have fewer pieces than this')
+    parser.add_argument('--depth', type=int, default=BOOK_DEPTH, help='search depth of every book position')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--directory', default=BOOK_DIR)
+    args = parser.parse_args(argv)
+    if args.sizes == 'all':
+        sizes = [(rows, cols) for rows in range(MIN_SIZE, MAX_SIZE + 1) for cols in range(MIN_SIZE, MAX_SIZE + 1)]
+    else:
+        sizes = [tuple(int(n) for n in size.split('x')) for size in args.sizes.split(',')]
+    for rows, cols in sizes:
+        path = write_book(rows, cols, args.plies, args.depth, args.workers, args.directory)
+        book = OpeningBook(path)
+        print('%dx%d: %d positions -> %s' % (rows, cols, len(book), path), flush=True)
+        book.close()
+
+
+if __name__ == '__main__':
+    main()
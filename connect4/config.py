@@ -0,0 +1,57 @@
+"""
+Game settings: opponent, board size, first player and AI difficulty.
+"""
+
+# board size limits:
+MIN_SIZE = 4
+MAX_SIZE = 10
+# default settings file (format: OPPONENT ROWS COLS FIRST_PLAYER [DIFFICULTY], e.g. 'computer 6 7 human hard'):
+CONFIG_FILE = '4inaROW.txt'
+# levels of difficulty of the AI (see connect4.search.DIFFICULTIES):
+DIFFICULTY_LEVELS = ('easy', 'medium', 'hard')
+
+
+class GameConfig(object):
+    """
+    Class for the settings of a game.
+
+    Methods for:
+    - initialization (with validation)
+    - player moving first as board value (1 for human/player 1, 2 for computer/player 2)
+    """
+
+    def __init__(self, opponent: str = 'computer', rows: int = 6, cols: int = 7, first_player: str = 'human',
+                 difficulty: str = None):
+        if opponent not in ('computer', 'human'):
+            raise ValueError("opponent must be 'computer' or 'human', not %r" % opponent)
+        if not (MIN_SIZE <= rows <= MAX_SIZE and MIN_SIZE <= cols <= MAX_SIZE):
+            raise ValueError('Board must be at least %dx%d and at most %dx%d.'
+                             % (MIN_SIZE, MIN_SIZE, MAX_SIZE, MAX_SIZE))
+        if first_player not in ('computer', 'human'):
+            raise ValueError("first player must be 'computer' or 'human', not %r" % first_player)
+        if difficulty is not None and difficulty not in DIFFICULTY_LEVELS:
+            raise ValueError('difficulty must be one of %s, not %r' % (', '.join(DIFFICULTY_LEVELS), difficulty))
+        self.opponent = opponent
+        self.rows = rows
+        self.cols = cols
+        self.first_player = first_player
+        self.difficulty = difficulty  # None: chosen in the GUI
+
+    @property
+    def first_turn(self) -> int:
+        return 1 if self.first_player == 'human' else 2
+
+
+def read_config(path: str = CONFIG_FILE) -> GameConfig:
+    """
+    Function reading the game settings from input file 'path'.
+
+    :param path: settings file (OPPONENT ROWS COLS FIRST_PLAYER, then DIFFICULTY if it isn't chosen in the GUI)
+    :return: GameConfig
+    """
+    with open(path, 'r') as file:
+        fields = file.read().split()
+    if len(fields) not in (4, 5):
+        raise ValueError('%s: expected OPPONENT ROWS COLS FIRST_PLAYER [DIFFICULTY]' % path)
+    opponent, rows, cols, first_player = fields[:4]
+    return GameConfig(opponent, int(rows), int(cols), first_player, fields[4] if len(fields) == 5 else None)
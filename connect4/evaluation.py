@@ -0,0 +1,139 @@
+"""
+Heuristic evaluation of Connect-Four positions, scored window by window (4 aligned cells).
+"""
+import numpy as np
+
+from connect4.board import board_windows
+
+
+# score of a window of 4 cells, by number of own pieces (first index) and opponent pieces (second index):
+WINDOW_SCORES = np.zeros((5, 5), dtype=np.int64)
+WINDOW_SCORES[4][0] = 1000  # 4-piece sequence
+WINDOW_SCORES[3][0] = 500  # 3-piece sequence (+ 1 free cell)
+WINDOW_SCORES[2][0] = 200  # 2-piece sequence (+ 2 free cells)
+WINDOW_SCORES[0][3] = -400  # opponent 3-piece sequence (+ 1 free cell)
+# score of each own piece on the center column:
+CENTER_SCORE = 10
+
+# window scores by window code (own pieces + 5 * opponent pieces):
+_SCORE_BY_CODE = np.zeros(21, dtype=np.int64)
+for _own in range(5):
+    for _opp in range(5 - _own):
+        _SCORE_BY_CODE[_own + 5 * _opp] = WINDOW_SCORES[_own][_opp]
+# window code of a cell value (0 free, 1 or 2), for piece = 1 and piece = 2:
+_CELL_CODES = (None, np.array([0, 1, 5], dtype=np.int8), np.array([0, 5, 1], dtype=np.int8))
+
+# windows of 4 cells as index arrays, one per board size:
+_WINDOW_INDEX = {}
+
+
+def window_index(rows: int, cols: int):
+    """
+    :return: (number of windows, 4) array with the cells (row * cols + col) of every window of 4 aligned cells
+    """
+    key = (rows, cols)
+    if key not in _WINDOW_INDEX:
+        _WINDOW_INDEX[key] = np.array(board_windows(rows, cols)[0], dtype=np.intp)
+    return _WINDOW_INDEX[key]
+
+
+def evaluate(cells, rows: int, cols: int, piece: int) -> int:
+    """
+    Function computing the board score for player 'piece' with a few NumPy operations
+    (same rules and result as compute_score_reference).
+
+    :param cells: flat array of board values (row 0 first)
+    :param rows: number of rows on the board
+    :param cols: number of columns on the board
+    :param piece: board value for player
+    :return: score as integer
+    """
+    codes = _CELL_CODES[piece][cells]
+    score = _SCORE_BY_CODE[codes[window_index(rows, cols)].sum(axis=1)].sum()
+    center = codes[(cols - 1) // 2::cols]
+    return int(score) + CENTER_SCORE * int((center == 1).sum())
+
+
+def compute_score_reference(board, piece: int) -> int:
+    """
+    Reference (cell by cell) implementation of the evaluation, used to check and benchmark 'evaluate'.
+
+    :param board: virtual board
+    :param piece: board value for player
+    :return: score as integer
+    """
+    rows, cols = len(board), len(board[0])
+    total = 0
+    for window in board_windows(rows, cols)[0]:
+        own = opp = 0
+        for cell in window:
+            value = board[cell // cols][cell % cols]
+            if value == piece:
+                own += 1
+            elif value == 3 - piece:
+                opp += 1
+        total += int(WINDOW_SCORES[own][opp])
+    for row in range(rows):
+        if board[row][(cols - 1) // 2] == piece:
+            total += CENTER_SCORE
+    return total
+
+
+class IncrementalEvaluator(object):
+    """
+    Class keeping the evaluation of a position (see compute_score) up to date while the search
+    makes and unmakes moves, instead of scoring the whole board at every leaf.
+
+    For every window of 4 cells it keeps the window code (own pieces + 5 * opponent pieces),
+    and the running score of player 'piece'. A drop only changes the windows through its cell.
+
+    Methods for:
+    - initialization from a position (full evaluation)
+    - updating the score after a piece is dropped (add) or taken back (remove)
+    - debug mode: checking every update against a full evaluation
+    """
+
+    def __init__(self, position, piece: int, debug: bool = False):
+        self.position = position
+        self.piece = piece
+        self.debug = debug
+        self.rows, self.cols = position.rows, position.cols
+        windows, self.cell_windows, _ = board_windows(self.rows, self.cols)
+        self.score_by_code = [int(score) for score in _SCORE_BY_CODE]
+        self.center = (self.cols - 1) // 2
+        # start from the empty board (all windows score 0) and add the pieces already on the board:
+        self.codes = [0] * len(windows)
+        self.score = 0
+        for cell, value in enumerate(position.cells):
+            if value:
+                self.update(cell, 1 if value == piece else 5)
+        self.check()
+
+    def update(self, cell: int, delta: int):
+        codes, score_by_code = self.codes, self.score_by_code
+        score = self.score
+        for w in self.cell_windows[cell]:
+            code = codes[w]
+            score += score_by_code[code + delta] - score_by_code[code]
+            codes[w] = code + delta
+        if delta in (1, -1) and cell % self.cols == self.center:
+            score += CENTER_SCORE * delta
+        self.score = score
+
+    # piece of 'player' was dropped on cell:
+    def add(self, cell: int, player: int):
+        self.update(cell, 1 if player == self.piece else 5)
+        if self.debug:
+            self.check()
+
+    # piece of 'player' was taken back from cell:
+    def remove(self, cell: int, player: int):
+        self.update(cell, -1 if player == self.piece else -5)
+        if self.debug:
+            self.check()
+
+    # compare running score with a full evaluation of the position (debug mode):
+    def check(self):
+        if self.debug:
+            expected = evaluate(np.frombuffer(self.position.cells, dtype=np.int8), self.rows, self.cols, self.piece)
+            assert self.score == expected, 'incremental score %d != full evaluation %d' % (self.score, expected)
@@ -0,0 +1,190 @@
+"""
+Root-parallel AI search: the root moves of a position are shared between the worker processes of a pool.
+"""
+import os
+import random
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from connect4.board import BITS, center_order
+from connect4.search import WIN_SCORE, Engine, SearchTimeout, forced_move, tactical_moves
+from connect4.stats import SearchStats
+from connect4.transposition import TT_MEMORY_MB, open_table
+
+# search engine of a worker process (one per process, so its transposition table stays warm between moves):
+_worker_engine = None
+# hash of the root position the worker engine last searched:
+_worker_root = None
+# directory of the persistent transposition tables shared by the workers (None: tables in memory), and their size:
+_worker_tt_directory = None
+_worker_tt_memory_mb = TT_MEMORY_MB
+
+
+def _init_worker(tt_memory_mb: float, tt_directory: str = None):
+    global _worker_engine, _worker_tt_directory, _worker_tt_memory_mb
+    _worker_tt_directory, _worker_tt_memory_mb = tt_directory, tt_memory_mb
+    # (with a tt_directory, the table of a board size is opened with the first root of that size)
+    _worker_engine = Engine(0, tt_memory_mb=tt_memory_mb if tt_directory is None else 0)
+
+
+def _search_root_move(position, col, ply_level, alpha, beta, time_budget_ms, keep_table):
+    """
+    Task run by a worker process: score root move 'col' of 'position'.
+
+    :return: (col, score, stats), score is None if the time budget was spent
+    """
+    global _worker_root
+    engine = _worker_engine
+    if position.hash != _worker_root:
+        # new root: age (or clear) the transposition table and start the move ordering afresh
+        _worker_root = position.hash
+        if _worker_tt_directory is not None:
+            if (getattr(engine.tt, 'rows', None), getattr(engine.tt, 'cols', None)) != (position.rows, position.cols):
+                engine.tt = open_table(_worker_tt_directory, position.rows, position.cols, _worker_tt_memory_mb)
+        elif not keep_table:
+            engine.tt.clear()
+        engine.tt.new_search()
+        engine.reset_ordering(position)
+    try:
+        return col, engine.search_move(position, col, ply_level, alpha, beta, time_budget_ms), engine.stats
+    except SearchTimeout:
+        return col, None, engine.stats
+
+
+class ParallelSearch(object):
+    """
+    Class for the parallel AI search (same interface as connect4.Engine for choosing moves).
+
+    The first root move is searched alone to get a score to beat; the other root moves are then
+    handed to the workers one at a time, each with alpha = best score so far - 1, so the bound
+    tightens as results come back (and moves scoring as much as the best one get exact scores).
+    With random_ties off, ties are broken like Engine does (most central move), so a fixed-depth
+    search returns the same move as the serial search.
+
+    The pool is created once and reused for every move; call close() (or use 'with') to stop it.
+
+    Methods for:
+    - initialization and shutdown of the process pool
+    - choosing the move to play (iterative deepening with a time budget)
+    - fixed-depth parallel root search
+    """
+
+    def __init__(self, ply: int, workers: int = None, time_budget_ms: int = None, tt_memory_mb: float = TT_MEMORY_MB,
+                 random_ties: bool = True, keep_tables: bool = True, tt_directory: str = None):
+        self.ply = ply  # maximum search depth
+        self.workers = workers or os.cpu_count() or 1
+        self.time_budget_ms = time_budget_ms
+        self.random_ties = random_ties
+        # keep_tables off: workers empty their transposition tables for every new root (reproducible results);
+        # tt_directory: all workers share the persistent tables of that directory (kept between runs)
+        self.keep_tables = keep_tables
+        self.pool = ProcessPoolExecutor(self.workers, initializer=_init_worker, initargs=(tt_memory_mb, tt_directory))
+        # start all workers now rather than on the first move:
+        for future in [self.pool.submit(time.sleep, 0) for _ in range(self.workers)]:
+            future.result()
+
+    def close(self):
+        self.pool.shutdown(wait=True, cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def choose_move(self, position):
+        """
+        :param position: bitboard position of the game (Position), engine to move
+        :return: column to play
+        """
+        return self.search(position)[0]
+
+    def search(self, position, time_budget_ms: int = None, max_depth: int = None):
+        """
+        Iterative deepening over parallel root searches (see Engine.search).
+
+        :param position: bitboard position of the game (Position), engine to move
+        :param time_budget_ms: time budget in milliseconds (defaults to the engine's, None for no limit)
+        :param max_depth: maximum ply level (defaults to the engine's ply)
+        :return: (column, score, stats), stats adding up the searches of all workers
+        """
+        if time_budget_ms is None:
+            time_budget_ms = self.time_budget_ms
+        if max_depth is None:
+            max_depth = self.ply
+        max_depth = max(1, min(max_depth, position.rows * position.cols - position.moves))
+        deadline = None
+        start = time.perf_counter()
+        stats = SearchStats()
+        forced = forced_move(position)
+        if forced is not None:
+            # a win now or the only move not losing at once: nothing to search
+            stats.forced = True
+            stats.column, stats.score = forced
+            stats.elapsed = time.perf_counter() - start
+            return forced[0], forced[1], stats
+        column, score = self.root_search(position, 1, stats=stats)
+        stats.depth = 1
+        stats.depth_times.append((1, time.perf_counter() - start, stats.nodes))
+        if time_budget_ms is not None:
+            deadline = start + time_budget_ms / 1000
+        try:
+            for depth in range(2, max_depth + 1):
+                if abs(score) == WIN_SCORE or len(position.legal_moves()) == 1:
+                    break
+                depth_start = time.perf_counter()
+                column, score = self.root_search(position, depth, deadline, first=column, stats=stats)
+                stats.depth = depth
+                stats.depth_times.append((depth, time.perf_counter() - depth_start, stats.nodes))
+        except SearchTimeout:
+            pass
+        stats.elapsed = time.perf_counter() - start
+        return column, score, stats
+
+    def root_search(self, position, ply_level: int, deadline: float = None, first: int = None,
+                    stats: SearchStats = None):
+        """
+        Search every root move of 'position' at depth 'ply_level' on the workers.
+
+        :param position: bitboard position of the game (Position), engine to move
+        :param ply_level: search depth
+        :param deadline: time.perf_counter() value at which the search is abandoned (SearchTimeout)
+        :param first: root move to search first (best move of the previous iteration)
+        :param stats: SearchStats the statistics of the workers are added to
+        :return: (column, score)
+        """
+        # (the moves worth searching, as in Engine.root_search: search only calls it without forced moves)
+        cells = tactical_moves(position)[1]
+        moves = [col for col in center_order(position.cols) if BITS[position.heights[col]] & cells]
+        if first in moves:
+            moves.remove(first)
+            moves.insert(0, first)
+        best_score, best_columns = -WIN_SCORE - 1, []
+
+        def submit(col):
+            budget = None if deadline is None else max(0, (deadline - time.perf_counter()) * 1000)
+            alpha = best_score - 1 if best_columns else -WIN_SCORE - 1
+            return self.pool.submit(_search_root_move, position, col, ply_level, alpha, WIN_SCORE + 1, budget,
+                                    self.keep_tables)
+
+        pending = {submit(moves.pop(0))}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                col, score, move_stats = future.result()
+                if stats is not None:
+                    stats.merge(move_stats)
+                if score is None:
+                    for other in pending:
+                        other.cancel()
+                    raise SearchTimeout()
+                if score > best_score:
+                    best_score, best_columns = score, [col]
+                elif score == best_score:
+                    best_columns.append(col)
+            # hand out the remaining moves with the best score so far:
+            while moves and len(pending) < self.workers:
+                pending.add(submit(moves.pop(0)))
+        if self.random_ties:
+            return random.choice(best_columns), best_score
+        return min(best_columns, key=center_order(position.cols).index), best_score
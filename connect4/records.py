@@ -0,0 +1,163 @@
+"""
+Game records: every game (GUI, two players, self-play) appended to a log file in a compact binary format,
+and a streaming reader replaying the games of a log.
+
+A log starts with a file header (magic, version), followed by the records one after the other:
+a 5-byte record header (rows, cols, first player, winner, number of moves), then one byte per move
+(its column). A 6x7 game of 30 moves takes 35 bytes. Records are only ever appended, each with a single
+write, so several processes can log to the same file.
+
+The reader streams the log (a record at a time, constant memory) and can rebuild the position after
+every move incrementally, for analysis, book building and regression replays.
+
+Usage: python -m connect4.records LOG (summary of a log: games per board size, results, moves)
+"""
+import os
+import struct
+import sys
+from collections import Counter
+
+from connect4.board import Position
+
+# log of the games played (in the working directory, like the settings file):
+GAMES_LOG = 'games.c4log'
+LOG_MAGIC = b'C4GL'
+LOG_VERSION = 1
+LOG_HEADER = struct.Struct('<4sB')
+RECORD = struct.Struct('<BBBBB')  # rows, cols, first player, winner, number of moves
+# winner of a game that was not played to the end (e.g. the window was closed):
+UNFINISHED = 3
+
+
+class GameRecord(object):
+    """
+    Class for the record of one game.
+
+    Methods for:
+    - initialization (board size, first player, winner, moves)
+    - binary encoding (one log entry)
+    - replaying the game on a position
+    """
+
+    __slots__ = ('rows', 'cols', 'first_player', 'winner', 'moves')
+
+    def __init__(self, rows: int, cols: int, first_player: int, winner: int, moves):
+        self.rows = rows
+        self.cols = cols
+        self.first_player = first_player  # board value of the player who moved first (1 or 2)
+        self.winner = winner  # 1 or 2, 0 for a draw, UNFINISHED
+        self.moves = bytes(moves)  # columns, in the order they were played
+
+    def __len__(self):
+        return len(self.moves)
+
+    def __repr__(self):
+        return 'GameRecord(%dx%d, first %d, winner %d, %d moves)' % (self.rows, self.cols, self.first_player,
+                                                                       self.winner, len(self.moves))
+
+    def encode(self) -> bytes:
+        return RECORD.pack(self.rows, self.cols, self.first_player, self.winner, len(self.moves)) + self.moves
+
+    def positions(self):
+        """
+        Replay the game on a new position.
+
+        :return: generator of the position after each move (the same Position object, updated
+                 incrementally: copy() it to keep it)
+        """
+        position = Position(self.rows, self.cols, self.first_player)
+        for col in self.moves:
+            if not position.can_play(col):
+                raise ValueError('%r: illegal move %d after %d moves' % (self, col, position.moves))
+            position.play(col)
+            yield position
+
+
+class GameLog(object):
+    """
+    Class for an append-only log of games.
+
+    Methods for:
+    - opening the log (created with its header if needed) and closing it
+    - appending a game
+    """
+
+    def __init__(self, path: str = GAMES_LOG):
+        self.path = path
+        self.file = open(path, 'ab', buffering=0)
+        if self.file.tell() == 0:
+            self.file.write(LOG_HEADER.pack(LOG_MAGIC, LOG_VERSION))
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def append(self, rows: int, cols: int, first_player: int, winner: int, moves):
+        """
+        :param first_player: board value of the player who moved first (1 or 2)
+        :param winner: 1 or 2, 0 for a draw, UNFINISHED
+        :param moves: columns played, in order
+        :return: -
+        """
+        self.file.write(GameRecord(rows, cols, first_player, winner, moves).encode())
+
+
+def read_games(path: str = GAMES_LOG):
+    """
+    Stream the games of a log, one record at a time (a partly written last record is left out).
+
+    :return: generator of GameRecord
+    """
+    with open(path, 'rb') as file:
+        header = file.read(LOG_HEADER.size)
+        if len(header) < LOG_HEADER.size or LOG_HEADER.unpack(header) != (LOG_MAGIC, LOG_VERSION):
+            raise ValueError('%s is not a game log (version %d)' % (path, LOG_VERSION))
+        while True:
+            header = file.read(RECORD.size)
+            if len(header) < RECORD.size:
+                return
+            rows, cols, first_player, winner, count = RECORD.unpack(header)
+            moves = file.read(count)
+            if len(moves) < count:
+                return
+            yield GameRecord(rows, cols, first_player, winner, moves)
+
+
+def replay(path: str = GAMES_LOG):
+    """
+    Replay every game of a log, rebuilding the positions incrementally.
+
+    :return: generator of (GameRecord, position after each of its moves); the position is updated
+             in place from one move to the next
+    """
+    for record in read_games(path):
+        for position in record.positions():
+            yield record, position
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    path = argv[0] if argv else GAMES_LOG
+    games, results, moves = Counter(), Counter(), 0
+    for record in read_games(path):
+        games[(record.rows, record.cols)] += 1
+        if record.winner in (1, 2):
+            results['first' if record.winner == record.first_player else 'second'] += 1
+        else:
+            results[record.winner] += 1
+        moves += len(record)
+    total = sum(games.values())
+    print('%s: %d games, %d moves, %d bytes' % (path, total, moves, os.path.getsize(path)))
+    for (rows, cols), count in sorted(games.items()):
+        print('%2dx%-2d %d games' % (rows, cols, count))
+    print('first player won %d, second player won %d, draws %d, unfinished %d'
+          % (results['first'], results['second'], results[0], results[UNFINISHED]))
+
+
+if __name__ == '__main__':
+    main()
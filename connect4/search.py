@@ -0,0 +1,562 @@
+"""
+AI search for Connect-Four: iterative deepening alpha-beta minimax on bitboard positions,
+with a transposition table, move ordering and an incremental evaluation.
+"""
+import random
+import sys
+import time
+
+import numpy as np
+
+from connect4.board import BITS, Position, center_order
+from connect4.evaluation import IncrementalEvaluator, evaluate
+from connect4.stats import SearchStats, profile_call
+from connect4.transposition import EXACT, LOWER, UPPER, TT_MEMORY_MB, TranspositionTable
+
+# score of a won game (from the maximizing player's point of view):
+WIN_SCORE = 100000000000000
+LOSS_SCORE = -WIN_SCORE
+# bounds of the search window, beyond any score (module constants: no int is built per node):
+MIN_SCORE, MAX_SCORE = -WIN_SCORE - 1, WIN_SCORE + 1
+# move ordering values above any history score: move of the transposition table, then the two killer moves
+TT_MOVE_VALUE, KILLER_VALUES = sys.maxsize, (sys.maxsize - 1, sys.maxsize - 2)
+# mixed into the Zobrist hash of a position to get its transposition table key, by maximizing player: scores are
+# stored from that player's point of view (and the evaluation is not symmetric), so one table can serve both sides
+PLAYER_KEYS = (0, 0x9e3779b97f4a7c15, 0)
+# time budget of one AI move (in milliseconds):
+MEDIUM_TIME_BUDGET_MS = 300
+HARD_TIME_BUDGET_MS = 1500
+# (maximum ply level, time budget per move) of each level of difficulty (easy plays at random):
+DIFFICULTIES = {
+    'easy': (0, None),
+    'medium': (3, MEDIUM_TIME_BUDGET_MS),
+    'hard': (7, HARD_TIME_BUDGET_MS),
+}
+
+
+def tactical_moves(board):
+    """
+    Tactical pre-check of a position (see Position.threats), done by every node of the search
+    instead of finding one-move wins and blocks by searching to the horizon.
+
+    :param board: bitboard position of the game (Position), not won yet
+    :return: (cells where the player to move wins now (0 if none), cells worth searching otherwise:
+             the block of the opponent's threat if there is one, else every move that does not let the opponent
+             win on top of it; 0 if every move loses at once), as bitmasks of playable cells
+    """
+    wins, blocks, unsafe = board.threats()
+    if wins:
+        return wins, 0
+    if blocks:
+        # two threats can't both be blocked, and a block right below another threat loses as well:
+        return 0, 0 if blocks & (blocks - 1) or blocks & unsafe else blocks
+    return 0, board.possible_moves() & ~unsafe
+
+
+def forced_move(board):
+    """
+    Moves played without a search (see tactical_moves): a win now, the only move that does not lose at once
+    (blocking the opponent's threat, or not letting the opponent win on top of it), or a move of a position lost
+    next move (blocking one of the threats, if any).
+
+    :param board: bitboard position of the game (Position), not won yet
+    :return: (column, score for the player to move), None if the position has to be searched
+    """
+    wins, moves = tactical_moves(board)
+    if wins:
+        return board.column_of(wins), WIN_SCORE
+    if not moves:
+        blocks = board.threats()[1]
+        return board.column_of(blocks or board.possible_moves()), LOSS_SCORE
+    if moves & (moves - 1):
+        return None
+    column = board.column_of(moves)
+    position = board.copy()
+    position.play(column)
+    return column, evaluate(np.frombuffer(position.cells, dtype=np.int8), board.rows, board.cols, board.turn)
+
+
+class SearchTimeout(Exception):
+    """
+    Exception raised inside minimax when the time budget of the current move is spent.
+    """
+    pass
+
+
+class Engine(object):
+    """
+    Class for the AI search engine (headless; the GUI player in main.py builds on it).
+
+    Methods for:
+    - initialization
+    - choosing the move to play in a position
+    - iterative deepening search with a time budget (with statistics, optionally profiled)
+    - minimax with alpha-beta pruning
+    - move ordering
+    - computing score for player (returns int)
+    """
+
+    def __init__(self, ply: int, tt_memory_mb: float = TT_MEMORY_MB, time_budget_ms: int = None,
+                 debug_eval: bool = False, random_ties: bool = True, on_depth=None, profile_path: str = None,
+                 book=None, solver=None, tt: TranspositionTable = None):
+        self.ply = ply  # maximum search depth (0: random moves)
+        # break ties between equal best moves at random (otherwise: the most central one):
+        self.random_ties = random_ties
+        # transposition table (kept between the moves of a game; tt: a table to use instead of a new one,
+        # e.g. a connect4.transposition.PersistentTranspositionTable kept between runs):
+        self.tt = tt if tt is not None else TranspositionTable(tt_memory_mb)
+        # time budget per move (None for no limit) and deadline of the running search:
+        self.time_budget_ms = time_budget_ms
+        self.deadline = None
+        # function returning True when the running search must stop at once (SearchTimeout), e.g. when it was
+        # cancelled by the GUI (see connect4.background); None: searches only stop on their deadline
+        self.stop = None
+        # statistics of the running (or last) search; on_depth(stats) is called after each completed depth:
+        self.stats = SearchStats()
+        self.on_depth = on_depth
+        # profile_path set: every search runs under cProfile, the profile of the last one is dumped there
+        self.profile_path = profile_path
+        # opening book (connect4.book.OpeningBook) answering the first moves without a search:
+        self.book = book
+        # exact solver (connect4.solver.Solver) taking over once at most solver.cells cells are free:
+        self.solver = solver
+        # move ordering: killer moves (two per number of pieces on the board) and history table (per player and cell)
+        self.killers = []
+        self.history = [[], [], []]
+        # ordered moves and their ordering values, one list per number of pieces on the board (see order_moves):
+        self.move_lists = []
+        self.move_values = []
+        # evaluation of the search board (set up by search; debug_eval checks every update):
+        self.evaluator = None
+        self.debug_eval = debug_eval
+
+    def new_game(self):
+        """
+        Forget what previous games taught the engine (transposition table, killer moves and history table),
+        so its moves don't depend on the games it played before.
+        """
+        self.tt.clear()
+        self.killers = []
+        self.history = [[], [], []]
+
+    def choose_move(self, position):
+        """
+        :param position: bitboard position of the game (Position), engine to move
+        :return: column to play (at random for ply 0, best move of the search otherwise)
+        """
+        if self.ply < 1:
+            return random.choice(position.legal_moves())
+        return self.search(position)[0]
+
+    # drop piece on the search board and update its evaluation:
+    def play_move(self, board, col):
+        player = board.turn
+        self.evaluator.add(board.play(col), player)
+
+    # take back the last move of the search board:
+    def undo_move(self, board):
+        self.evaluator.remove(board.undo(), board.turn)
+
+    # compute score for player at a given time:
+    def compute_score(self, board, piece: int) -> int:
+        """
+        Function computing the board score for player 'piece' as follows:
+
+        ________________ RULES__________________
+        for each window of 4 aligned cells (horizontal, vertical or diagonal):
+
+        4 player pieces --> player_score += 1000
+        3 player pieces + 1 free cell --> player_score += 500
+        2 player pieces + 2 free cells --> player_score += 200
+        3 opponent pieces + 1 free cell --> player_score -= 400
+
+        player_score += 10 for each player piece in the center column
+        __________________________
+
+        :param board: virtual board or bitboard position (Position)
+        :param piece: board value for player
+        """
+        if isinstance(board, Position):
+            return evaluate(np.frombuffer(board.cells, dtype=np.int8), board.rows, board.cols, piece)
+        board = np.asarray(board, dtype=np.int8)
+        return evaluate(board.ravel(), board.shape[0], board.shape[1], piece)
+
+
+    """ ___________________________ MINIMAX __________________________"""
+
+    def minimax(self, board, ply_level, alpha, beta, max_player):
+        """
+        :param board: bitboard position of the game (Position); moves are made and unmade on it,
+                      with self.evaluator following it (see search)
+        :param ply_level: current ply level
+        :param alpha: lower bound of the search window
+        :param beta: upper bound of the search window
+        :param max_player: maximizing player (1 for human, 2 for computer)
+        :return: (column, score) of the best move for the player to move (board must not be won already)
+        """
+        # is time over, or was the search stopped? (only checked every 64 nodes)
+        stats = self.stats
+        stats.nodes += 1
+        if not stats.nodes & 63 and (self.deadline is not None and time.perf_counter() > self.deadline
+                                     or self.stop is not None and self.stop()):
+            raise SearchTimeout()
+
+        # is end of recursion?
+        # (a parent with a winning move returns at once, so the board is never won already)
+        if board.is_full():
+            # tie
+            stats.terminals += 1
+            return None, 0
+        # else, if we reach ply level 0:
+        elif ply_level < 1:
+            stats.leaves += 1
+            return None, self.evaluator.score  # return AI score
+
+        # look position up in the transposition table:
+        alpha_orig, beta_orig = alpha, beta
+        key = board.hash ^ PLAYER_KEYS[max_player]
+        entry = self.tt.probe(key)
+        tt_move = None
+        if entry is not None:
+            stats.tt_hits += 1
+            tt_depth, tt_score, tt_flag, tt_move = entry
+            if tt_depth >= ply_level:
+                if tt_flag == EXACT:
+                    return tt_move, tt_score
+                elif tt_flag == LOWER:
+                    alpha = max(alpha, tt_score)
+                else:
+                    beta = min(beta, tt_score)
+                if alpha >= beta:
+                    return tt_move, tt_score
+
+        # win now, or the moves worth searching (block of a threat, moves not letting the opponent win above):
+        wins, moves = tactical_moves(board)
+        if wins:
+            stats.terminals += 1
+            return board.column_of(wins), WIN_SCORE if board.turn == max_player else LOSS_SCORE
+        if not moves:
+            # the opponent wins next move, whatever is played
+            stats.terminals += 1
+            return board.column_of(board.possible_moves()), LOSS_SCORE if board.turn == max_player else WIN_SCORE
+
+        # get available moves (most promising first):
+        available_columns = self.order_moves(board, tt_move, moves)
+
+        # maximizing player's turn:
+        if board.turn == max_player:
+            column, score = available_columns[0], MIN_SCORE
+            for col_ in available_columns:
+                if col_ < 0:
+                    break
+                self.play_move(board, col_)
+                new_score = self.minimax(board, ply_level - 1, alpha, beta, max_player)[1]
+                self.undo_move(board)
+                # maximizing alpha:
+                if new_score > score:
+                    score = new_score
+                    column = col_
+                alpha = max(alpha, score)
+                if alpha >= beta:
+                    stats.cutoffs += 1
+                    if col_ == available_columns[0]:
+                        stats.first_move_cutoffs += 1
+                    self.record_cutoff(board, col_, ply_level)
+                    break
+            self.store_result(key, ply_level, score, column, alpha_orig, beta_orig)
+            return column, score
+
+        # minimizing player's turn:
+        else:
+            column, score = available_columns[0], MAX_SCORE
+            for col_ in available_columns:
+                if col_ < 0:
+                    break
+                self.play_move(board, col_)
+                new_score = self.minimax(board, ply_level - 1, alpha, beta, max_player)[1]
+                self.undo_move(board)
+                # minimizing beta:
+                if new_score < score:
+                    score = new_score
+                    column = col_
+                beta = min(beta, score)
+                if alpha >= beta:
+                    stats.cutoffs += 1
+                    if col_ == available_columns[0]:
+                        stats.first_move_cutoffs += 1
+                    self.record_cutoff(board, col_, ply_level)
+                    break
+            self.store_result(key, ply_level, score, column, alpha_orig, beta_orig)
+            return column, score
+
+    def search(self, board, time_budget_ms: int = None, max_depth: int = None, new_search: bool = True):
+        """
+        Iterative deepening driver around minimax: searches depth 1, 2, ... until max_depth
+        or until the time budget is spent, and returns the best move of the last completed depth.
+
+        The best move of each iteration stays in the transposition table and is searched first
+        by the next one (the root entry is the deepest of the search, so it is never replaced).
+        Depth 1 always completes, so a legal move is returned even with a tiny budget.
+        Positions of the opening book (if any) are answered from the book, without searching, as are forced
+        moves (see forced_move: a win now, the only move not losing at once), and endgames are left to the
+        exact solver (if any) while it finishes within the time budget.
+
+        :param board: bitboard position of the game (Position), AI to move
+        :param time_budget_ms: time budget in milliseconds (defaults to the AI's, None for no limit)
+        :param max_depth: maximum ply level (defaults to the AI's ply)
+        :param new_search: age the transposition table first (off for all but the first of several searches
+                           making up one task, such as pondering: the age has 3 bits only)
+        :return: (column, score, stats) with stats the SearchStats of this search (also in self.stats)
+        """
+        if self.profile_path is not None:
+            return profile_call(self.profile_path, self._search, board, time_budget_ms, max_depth, new_search)
+        return self._search(board, time_budget_ms, max_depth, new_search)
+
+    def _search(self, board, time_budget_ms, max_depth, new_search):
+        start = time.perf_counter()
+        stats = self.stats = SearchStats()
+        if time_budget_ms is None:
+            time_budget_ms = self.time_budget_ms
+        if self.book is not None:
+            entry = self.book.lookup(board)
+            if entry is not None:
+                stats.book = True
+                return entry[0], entry[1], stats
+        forced = forced_move(board)
+        if forced is not None:
+            stats.forced = True
+            stats.column, stats.score = forced
+            stats.elapsed = time.perf_counter() - start
+            return forced[0], forced[1], stats
+        free_cells = board.rows * board.cols - board.moves
+        if self.solver is not None and free_cells <= self.solver.cells:
+            solved = self.solve(board, None if time_budget_ms is None else start + time_budget_ms / 1000)
+            if solved is not None:
+                stats.elapsed = time.perf_counter() - start
+                return solved[0], solved[1], stats
+        if max_depth is None:
+            max_depth = self.ply
+        max_depth = max(1, min(max_depth, free_cells))
+        max_player = board.turn
+        if new_search:
+            self.tt.new_search()
+        self.reset_ordering(board)
+        # the search makes and unmakes moves on its own copy of the board (left as is on timeout):
+        board = board.copy()
+        self.evaluator = IncrementalEvaluator(board, max_player, self.debug_eval)
+
+        column, score = self.root_search(board, 1, max_player)
+        self.depth_done(1, start, start, column, score)
+        if time_budget_ms is not None:
+            self.deadline = start + time_budget_ms / 1000
+        try:
+            for depth in range(2, max_depth + 1):
+                # a forced win/loss was found: deeper searches won't change the move
+                if abs(score) == WIN_SCORE or len(board.legal_moves()) == 1:
+                    break
+                depth_start = time.perf_counter()
+                column, score = self.root_search(board, depth, max_player)
+                self.depth_done(depth, depth_start, start, column, score)
+        except SearchTimeout:
+            pass
+        finally:
+            self.deadline = None
+            stats.elapsed = time.perf_counter() - start
+        return column, score, stats
+
+    def solve(self, board, deadline):
+        """
+        Play the exact solver's move (see connect4.solver), with its score on the search scale.
+
+        :param deadline: time.perf_counter() value at which the solver gives up
+        :return: (column, score), None if the solver ran out of time (the search takes over)
+        """
+        nodes = self.solver.nodes
+        self.solver.stop = self.stop
+        try:
+            column, score = self.solver.best_move(board, deadline)
+        except SearchTimeout:
+            return None
+        finally:
+            self.stats.nodes = self.solver.nodes - nodes
+        self.stats.solved = True
+        return column, WIN_SCORE if score > 0 else -WIN_SCORE if score < 0 else 0
+
+    # record the time and best move of a completed iteration and report it:
+    def depth_done(self, depth, depth_start, start, column, score):
+        stats = self.stats
+        now = time.perf_counter()
+        stats.depth = depth
+        stats.column, stats.score = column, score
+        stats.depth_times.append((depth, now - depth_start, stats.nodes))
+        if self.on_depth is not None:
+            stats.elapsed = now - start
+            self.on_depth(stats)
+
+    def root_search(self, board, ply_level, max_player):
+        """
+        Search every root move at depth 'ply_level' and pick the best one.
+
+        Moves after the first are searched with alpha = best score - 1, so a move scoring as much
+        as the best one gets an exact score; ties between equal best moves are broken at random
+        (the only place where the search uses randomness) unless random_ties is off.
+
+        :param board: bitboard position of the game (Position), max_player to move
+        :param ply_level: search depth
+        :param max_player: maximizing player (1 for human, 2 for computer)
+        :return: (column, score)
+        """
+        key = board.hash ^ PLAYER_KEYS[max_player]
+        entry = self.tt.probe(key)
+        best_score, best_columns = MIN_SCORE, []
+        # (search only calls it on positions without forced moves: see forced_move)
+        moves = tactical_moves(board)[1]
+        for col_ in self.order_moves(board, entry[3] if entry is not None else None, moves):
+            if col_ < 0:
+                break
+            alpha = best_score - 1 if best_columns else MIN_SCORE
+            self.play_move(board, col_)
+            new_score = self.minimax(board, ply_level - 1, alpha, MAX_SCORE, max_player)[1]
+            self.undo_move(board)
+            if new_score > best_score:
+                best_score, best_columns = new_score, [col_]
+            elif new_score == best_score:
+                best_columns.append(col_)
+        column = self.pick_tied(board, best_columns)
+        self.tt.store(key, ply_level, best_score, EXACT, column)
+        return column, best_score
+
+    # choose between root moves with the same (best) score:
+    def pick_tied(self, board, columns):
+        if self.random_ties:
+            return random.choice(columns)
+        return min(columns, key=center_order(board.cols).index)
+
+    def search_move(self, board, col, ply_level, alpha, beta, time_budget_ms: int = None):
+        """
+        Score one root move, so a root search can be split between several engines (see connect4.parallel).
+
+        :param board: bitboard position of the game (Position), maximizing player to move
+        :param col: root move to search
+        :param ply_level: search depth (counting the root move)
+        :param alpha: lower bound of the search window
+        :param beta: upper bound of the search window
+        :param time_budget_ms: time budget in milliseconds (None for no limit); SearchTimeout is raised when spent
+        :return: score of the move (exact if strictly inside the window, a bound otherwise);
+                 the statistics of this search are left in self.stats
+        """
+        self.stats = SearchStats()
+        if len(self.killers) != board.rows * board.cols + 1 or len(self.history[1]) != board.cols * (board.rows + 1):
+            # no ordering tables for this board size yet (callers reset them for every new root: see reset_ordering)
+            self.reset_ordering(board)
+        if board.is_winning_move(col):
+            self.stats.terminals += 1
+            return WIN_SCORE
+        max_player = board.turn
+        board = board.copy()
+        self.evaluator = IncrementalEvaluator(board, max_player, self.debug_eval)
+        if time_budget_ms is not None:
+            self.deadline = time.perf_counter() + time_budget_ms / 1000
+        try:
+            self.play_move(board, col)
+            return self.minimax(board, ply_level - 1, alpha, beta, max_player)[1]
+        finally:
+            self.deadline = None
+
+    """ ________________________ MOVE ORDERING ________________________"""
+
+    def reset_ordering(self, board):
+        """
+        Prepare the move ordering tables for a new search from position 'board':
+        killer moves are forgotten and the history table is aged (halved).
+        """
+        cells = board.rows * board.cols
+        self.killers = [[None, None] for _ in range(cells + 1)]
+        if len(self.move_lists) != cells + 1 or len(self.move_lists[0]) != board.cols + 1:
+            self.move_lists = [[-1] * (board.cols + 1) for _ in range(cells + 1)]
+            self.move_values = [[0] * board.cols for _ in range(cells + 1)]
+        size = board.cols * (board.rows + 1)
+        for player in (1, 2):
+            if len(self.history[player]) != size:
+                self.history[player] = [0] * size
+            else:
+                self.history[player] = [value >> 1 for value in self.history[player]]
+
+    def order_moves(self, board, tt_move=None, cells=None):
+        """
+        Order the available moves of 'board' (those dropping a piece on 'cells'): best move from
+        the transposition table first,
+        then the killer moves of this ply, then the rest by history score
+        (equal history scores keep the center-out column order).
+
+        The moves are insertion-sorted into the move list of this number of pieces (see reset_ordering),
+        which is reused by every node at that depth of the search: ordering allocates no list.
+
+        :param board: bitboard position of the game (Position)
+        :param tt_move: best move stored in the transposition table (or None)
+        :param cells: bitmask of the playable cells of the moves to order (see tactical_moves), None for all
+        :return: list of columns, ended by -1 (valid until the next order_moves at the same depth)
+        """
+        if cells is None:
+            cells = board.possible_moves()
+        heights = board.heights
+        history = self.history[board.turn]
+        killers = self.killers[board.moves]
+        moves, values = self.move_lists[board.moves], self.move_values[board.moves]
+        count = 0
+        for col in center_order(board.cols):
+            if not BITS[heights[col]] & cells:
+                continue
+            if col == tt_move:
+                value = TT_MOVE_VALUE
+            elif col == killers[0]:
+                value = KILLER_VALUES[0]
+            elif col == killers[1]:
+                value = KILLER_VALUES[1]
+            else:
+                value = history[heights[col]]
+            # (inserted after the moves of equal value)
+            index = count
+            while index and values[index - 1] < value:
+                moves[index] = moves[index - 1]
+                values[index] = values[index - 1]
+                index -= 1
+            moves[index] = col
+            values[index] = value
+            count += 1
+        moves[count] = -1
+        return moves
+
+    def record_cutoff(self, board, col, ply_level):
+        """
+        Remember move 'col' of 'board' that caused a cutoff: as killer move for this ply
+        and in the history table (weighted by the remaining depth).
+        """
+        killers = self.killers[board.moves]
+        if killers[0] != col:
+            killers[1] = killers[0]
+            killers[0] = col
+        self.history[board.turn][board.heights[col]] += ply_level * ply_level
+
+    def store_result(self, key, ply_level, score, column, alpha, beta):
+        """
+        Store the result of a search in the transposition table (under 'key', see PLAYER_KEYS), with its
+        bound type relative to the (alpha, beta) window the position was searched with.
+        """
+        if score <= alpha:
+            flag = UPPER
+        elif score >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.tt.store(key, ply_level, score, flag, column)
+
+
+def make_engine(difficulty: str, **options) -> Engine:
+    """
+    :param difficulty: level of difficulty ('easy', 'medium' or 'hard')
+    :param options: other Engine arguments (tt_memory_mb, debug_eval, ...)
+    :return: Engine playing at that level
+    """
+    ply, time_budget_ms = DIFFICULTIES[difficulty.lower()]
+    return Engine(ply, time_budget_ms=time_budget_ms, **options)
@@ -0,0 +1,358 @@
+"""
+Headless game server: many concurrent games against the AI over TCP, with asyncio.
+
+Usage: python -m connect4.server [--host 127.0.0.1] [--port 4444] [--workers W] [--record LOG]
+
+Protocol: one JSON object per line each way. Every request has a "cmd"; its "id" (if any) is sent back
+with the response, since the responses of a connection can come back in any order (a request doesn't wait
+for the AI moves of the other games). Requests:
+- {"cmd": "new", "rows": 6, "cols": 7, "level": "hard", "first": "human"}: new game (if the computer
+  moves first, the response has its move)
+- {"cmd": "move", "game": G, "col": 3}: the human's move, answered with the AI's one ("ai_move")
+- {"cmd": "state", "game": G}: moves, board, turn, winner of game G
+- {"cmd": "close", "game": G}: end game G (the games of a connection are also closed with it)
+- {"cmd": "metrics"} (optional "game": G, or "sessions": true): latency metrics
+
+A response is {"ok": true, "game": G, "moves": [...], "turn": T, "winner": W, "over": B, ...}, or
+{"ok": false, "error": "..."}. The human is player 1, the AI player 2; winner 0 while nobody has won.
+
+The medium and hard engines run in a shared process pool, so a slow search never holds up the other games.
+Easy moves (random) are played in the server process.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import multiprocessing
+import random
+import statistics
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from connect4.board import GameState
+from connect4.book import OpeningBook
+from connect4.config import GameConfig
+from connect4.records import UNFINISHED, GameLog
+from connect4.search import DIFFICULTIES, Engine
+from connect4.solver import Solver
+
+SERVER_HOST = '127.0.0.1'
+SERVER_PORT = 4444
+# transposition tables of the engines of a worker process (one engine per level and board size):
+SERVER_TT_MB = 4
+# number of latencies kept for the aggregate metrics (the most recent ones):
+METRICS_WINDOW = 100000
+
+# engines of a worker process, by (level, rows, cols):
+_worker_engines = {}
+
+
+def _engine_move(level: str, position):
+    """
+    Task run by a worker process: the AI's move in 'position'.
+
+    :return: (column, seconds spent searching)
+    """
+    key = (level, position.rows, position.cols)
+    if key not in _worker_engines:
+        ply, time_budget_ms = DIFFICULTIES[level]
+        # (the solver keeps its results in memory: the worker processes don't share a database)
+        solver = Solver(SERVER_TT_MB, db_path=None) if level == 'hard' else None
+        _worker_engines[key] = Engine(ply, tt_memory_mb=SERVER_TT_MB, time_budget_ms=time_budget_ms,
+                                      book=OpeningBook.for_size(position.rows, position.cols), solver=solver)
+    start = time.perf_counter()
+    column = _worker_engines[key].choose_move(position)
+    return column, time.perf_counter() - start
+
+
+def latency_summary(times) -> dict:
+    """
+    :param times: latencies in seconds
+    :return: {'count', 'median_ms', 'p90_ms', 'p99_ms', 'max_ms'}
+    """
+    if not times:
+        return {'count': 0}
+    times = sorted(times)
+
+    def percentile(p):
+        return round(times[min(len(times) - 1, int(p * len(times)))] * 1000, 3)
+
+    return {'count': len(times), 'median_ms': round(statistics.median(times) * 1000, 3),
+            'p90_ms': percentile(0.9), 'p99_ms': percentile(0.99), 'max_ms': round(times[-1] * 1000, 3)}
+
+
+class GameSession(object):
+    """
+    Class for one game hosted by the server.
+
+    Methods for:
+    - initialization (board size, level, first player)
+    - state and latency metrics (dictionaries sent to the client)
+    """
+
+    def __init__(self, game_id: int, config: GameConfig, level: str):
+        self.id = game_id
+        self.level = level
+        self.game = GameState(config.rows, config.cols, config.first_turn)
+        self.lock = asyncio.Lock()  # one request at a time per game
+        self.request_times = []  # seconds from request to response (moves)
+        self.engine_times = []  # seconds of the AI's searches
+        self.started = time.monotonic()
+
+    def state(self, board: bool = False) -> dict:
+        game = self.game
+        state = {'ok': True, 'game': self.id, 'moves': game.position.stack, 'turn': game.turn,
+                 'winner': game.winner, 'over': game.over}
+        if board:
+            state['board'] = game.board.tolist()
+        return state
+
+    def metrics(self) -> dict:
+        return {'game': self.id, 'level': self.level, 'moves': self.game.moves,
+                'seconds': round(time.monotonic() - self.started, 3),
+                'request_latency': latency_summary(self.request_times),
+                'engine_latency': latency_summary(self.engine_times)}
+
+
+class GameServer(object):
+    """
+    Class for the game server.
+
+    Methods for:
+    - initialization (address, worker processes, games log), starting and stopping
+    - connections: reading requests, sending responses
+    - requests: new game, move, state, close, metrics
+    - AI moves (in the process pool)
+    """
+
+    def __init__(self, host: str = SERVER_HOST, port: int = SERVER_PORT, workers: int = None, record: str = None):
+        self.host = host
+        self.port = port
+        # (workers are spawned, not forked: a forked worker would keep the sockets of the open connections)
+        self.pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn'))
+        self.log = GameLog(record) if record is not None else None  # finished games are appended to it
+        self.server = None
+        self.sessions = {}
+        self.game_ids = itertools.count(1)
+        # aggregate metrics:
+        self.games_started = self.games_finished = self.requests = self.errors = 0
+        self.connections = {}  # writer: task of each open connection
+        self.request_times = deque(maxlen=METRICS_WINDOW)
+        self.engine_times = deque(maxlen=METRICS_WINDOW)
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle_connection, self.host, self.port, limit=2 ** 16)
+        # (port 0: the system picked a free port)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        # hang up on the clients still connected:
+        for writer in list(self.connections):
+            writer.close()
+        await asyncio.gather(*self.connections.values(), return_exceptions=True)
+        for session in list(self.sessions.values()):
+            self.end_session(session)
+        self.pool.shutdown(cancel_futures=True)
+        if self.log is not None:
+            self.log.close()
+
+    async def handle_connection(self, reader, writer):
+        """
+        Read the requests of a connection (one JSON object per line) and answer each of them in a task of its own.
+        """
+        self.connections[writer] = asyncio.current_task()
+        games = set()  # games started on this connection
+        tasks = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                task = asyncio.ensure_future(self.respond(line, games, writer))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.wait(tasks)
+        except (ConnectionError, asyncio.LimitOverrunError, ValueError):
+            pass
+        finally:
+            del self.connections[writer]
+            for game_id in games:
+                if game_id in self.sessions:
+                    self.end_session(self.sessions[game_id])
+            writer.close()
+
+    async def respond(self, line: bytes, games: set, writer):
+        start = time.perf_counter()
+        self.requests += 1
+        request_id = None
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError('request must be a JSON object')
+            request_id = request.get('id')
+            response = await self.handle_request(request, games)
+        except Exception as error:
+            # a bad request (ValueError, KeyError, TypeError), or a failure of the engine pool (BrokenProcessPool):
+            # the client gets an error response either way
+            self.errors += 1
+            response = {'ok': False, 'error': '%s: %s' % (type(error).__name__, error)}
+        if request_id is not None:
+            response['id'] = request_id
+        if not writer.is_closing():
+            writer.write(json.dumps(response).encode() + b'\n')
+            await writer.drain()
+        elapsed = time.perf_counter() - start
+        self.request_times.append(elapsed)
+        # (a game's last request is left out of its metrics: the game is closed by then)
+        session = self.sessions.get(response.get('game'))
+        if session is not None:
+            session.request_times.append(elapsed)
+
+    async def handle_request(self, request: dict, games: set) -> dict:
+        """
+        :param request: decoded request (see the protocol above)
+        :param games: ids of the games started on the request's connection
+        :return: response
+        """
+        cmd = request['cmd']
+        if cmd == 'new':
+            return await self.new_game(request, games)
+        if cmd == 'metrics':
+            return self.metrics(request)
+        session = self.sessions.get(request['game'])
+        if session is None:
+            raise KeyError('no game %r' % request['game'])
+        if cmd == 'state':
+            return session.state(board=True)
+        if cmd == 'close':
+            self.end_session(session)
+            return session.state()
+        if cmd == 'move':
+            return await self.human_move(session, int(request['col']))
+        raise ValueError('unknown command %r' % cmd)
+
+    async def new_game(self, request: dict, games: set) -> dict:
+        level = request.get('level', 'medium').lower()
+        if level not in DIFFICULTIES:
+            raise ValueError('level must be one of %s' % ', '.join(DIFFICULTIES))
+        config = GameConfig('computer', int(request.get('rows', 6)), int(request.get('cols', 7)),
+                            request.get('first', 'human'), level)
+        session = GameSession(next(self.game_ids), config, level)
+        self.sessions[session.id] = session
+        games.add(session.id)
+        self.games_started += 1
+        async with session.lock:
+            response = session.state()
+            if session.game.turn == 2:
+                try:
+                    response = await self.ai_move(session)
+                except Exception:
+                    # no AI move: the game could not go on
+                    self.end_session(session)
+                    raise
+        return response
+
+    async def human_move(self, session: GameSession, col: int) -> dict:
+        async with session.lock:
+            if session.game.over:
+                raise ValueError('game %d is over' % session.id)
+            if session.game.turn != 1 or not session.game.can_play(col):
+                raise ValueError('illegal move %r' % col)
+            session.game.play(col)
+            if session.game.over:
+                self.end_session(session)
+                return session.state()
+            try:
+                return await self.ai_move(session)
+            except Exception:
+                # no AI move: take the human's move back, so it can be sent again
+                session.game.undo()
+                raise
+
+    async def ai_move(self, session: GameSession) -> dict:
+        """
+        Play the AI's move (searched in the process pool, except at the easy level).
+
+        :return: state of the game, with 'ai_move'
+        """
+        game = session.game
+        if DIFFICULTIES[session.level][0] < 1:
+            col, seconds = random.choice(game.legal_moves()), 0.0
+        else:
+            col, seconds = await asyncio.get_running_loop().run_in_executor(self.pool, _engine_move, session.level,
+                                                                            game.position.copy())
+        session.engine_times.append(seconds)
+        self.engine_times.append(seconds)
+        if session.id not in self.sessions:
+            # closed during the search
+            return session.state()
+        game.play(col)
+        if game.over:
+            self.end_session(session)
+        response = session.state()
+        response['ai_move'] = col
+        return response
+
+    def end_session(self, session: GameSession):
+        """
+        Remove a game from the server (and append it to the games log).
+        """
+        if self.sessions.pop(session.id, None) is None:
+            return
+        game = session.game
+        if game.over:
+            self.games_finished += 1
+        if self.log is not None:
+            self.log.append(game.rows, game.cols, game.first_player, game.winner if game.over else UNFINISHED,
+                            game.position.stack)
+
+    def metrics(self, request: dict) -> dict:
+        """
+        :return: metrics of game request['game'] if given, aggregate metrics otherwise
+                 (with those of every open game if request['sessions'])
+        """
+        if 'game' in request:
+            session = self.sessions.get(request['game'])
+            if session is None:
+                raise KeyError('no game %r' % request['game'])
+            return dict(session.metrics(), ok=True)
+        metrics = {'ok': True, 'connections': len(self.connections), 'open_games': len(self.sessions),
+                   'games_started': self.games_started, 'games_finished': self.games_finished,
+                   'requests': self.requests, 'errors': self.errors,
+                   'request_latency': latency_summary(self.request_times),
+                   'engine_latency': latency_summary(self.engine_times)}
+        if request.get('sessions'):
+            metrics['sessions'] = [session.metrics() for session in self.sessions.values()]
+        return metrics
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve Connect-Four games over TCP (JSON lines).')
+    parser.add_argument('--host', default=SERVER_HOST)
+    parser.add_argument('--port', type=int, default=SERVER_PORT)
+    parser.add_argument('--workers', type=int, default=None, help='engine processes')
+    parser.add_argument('--record', default=None, help='append the games to this games log')
+    args = parser.parse_args(argv)
+
+    async def serve():
+        server = GameServer(args.host, args.port, args.workers, args.record)
+        await server.start()
+        print('serving on %s:%d' % (server.host, server.port), flush=True)
+        try:
+            await server.server.serve_forever()
+        finally:
+            await server.close()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
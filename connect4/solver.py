@@ -0,0 +1,264 @@
+"""
+Exact solver for Connect-Four: negamax with null-window searches on bitboards and a transposition table,
+and an on-disk database of solved positions shared by every game and process.
+
+Scores are exact and from the point of view of the player to move: 0 for a draw, a positive score
+for a win (the sooner, the higher: (cells left after the winning move) // 2 + 1) and the opposite for a loss.
+
+Usage: python -m connect4.solver [ROWSxCOLS] (solves the empty board and stores the result)
+"""
+import os
+import sqlite3
+import sys
+import time
+
+from connect4.board import Position, board_geometry, center_order, winning_spots, zobrist_keys
+from connect4.search import SearchTimeout
+from connect4.transposition import LOWER, UPPER, TranspositionTable
+
+# database of solved positions (in the working directory, like the settings file):
+SOLVED_DB = 'solved.sqlite3'
+# memory of the solver's transposition table (in megabytes):
+SOLVER_TT_MB = 16
+# the AI hands positions with at most this many free cells over to the solver:
+SOLVER_CELLS = 20
+
+
+def popcount(mask: int) -> int:
+    return bin(mask).count('1')
+
+
+class SolvedPositions(object):
+    """
+    Class for the database of solved positions (sqlite3), keyed by board size and Zobrist hash.
+
+    Methods for:
+    - opening the database (created if needed) and closing it
+    - looking up / storing the exact score of a position
+    """
+
+    def __init__(self, path: str = SOLVED_DB):
+        self.path = path
+        self.connection = sqlite3.connect(path, timeout=30)
+        self.connection.execute('CREATE TABLE IF NOT EXISTS solved (rows INTEGER, cols INTEGER, hash INTEGER, '
+                                'score INTEGER, PRIMARY KEY (rows, cols, hash)) WITHOUT ROWID')
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
+
+    # sqlite integers are signed 64-bit:
+    @staticmethod
+    def key(position) -> int:
+        return position.hash - (1 << 64) if position.hash >= 1 << 63 else position.hash
+
+    def get(self, position):
+        """
+        :return: exact score of the position, None if it was never solved
+        """
+        row = self.connection.execute('SELECT score FROM solved WHERE rows = ? AND cols = ? AND hash = ?',
+                                      (position.rows, position.cols, self.key(position))).fetchone()
+        return None if row is None else row[0]
+
+    def put(self, position, score: int):
+        self.connection.execute('INSERT OR REPLACE INTO solved VALUES (?, ?, ?, ?)',
+                                (position.rows, position.cols, self.key(position), score))
+        self.connection.commit()
+
+
+class Solver(object):
+    """
+    Class for the exact solver.
+
+    Methods for:
+    - initialization (transposition table, database of solved positions, free cells threshold)
+    - solving a position (exact score, with a deadline)
+    - proving the value of a column, and choosing the best move
+    - negamax with alpha-beta pruning on bitboards
+    """
+
+    def __init__(self, tt_memory_mb: float = SOLVER_TT_MB, db_path: str = SOLVED_DB, cells: int = SOLVER_CELLS):
+        self.cells = cells  # used by Engine: positions with at most 'cells' free cells are solved
+        self.tt = TranspositionTable(tt_memory_mb)
+        # None: nothing is stored on disk
+        self.db = SolvedPositions(db_path) if db_path is not None else None
+        self.deadline = None
+        # function returning True when the solver must stop at once (see Engine.stop):
+        self.stop = None
+        self.nodes = 0
+
+    def close(self):
+        if self.db is not None:
+            self.db.close()
+
+    def solve(self, position, deadline: float = None) -> int:
+        """
+        :param position: bitboard position (Position), not won yet
+        :param deadline: time.perf_counter() value at which the solver gives up (SearchTimeout)
+        :return: exact score of the position for the player to move
+        """
+        if self.db is not None:
+            score = self.db.get(position)
+            if score is not None:
+                return score
+        cells = position.rows * position.cols
+        if any(position.is_winning_move(col) for col in position.legal_moves()):
+            score = (cells + 1 - position.moves) // 2
+        else:
+            score = self.null_window(position, deadline)
+        if self.db is not None:
+            self.db.put(position, score)
+        return score
+
+    def null_window(self, position, deadline: float = None) -> int:
+        """
+        Exact score by a sequence of null-window searches (bisection on the score), starting around 0.
+        """
+        rows, cols = position.rows, position.cols
+        cells = rows * cols
+        low, high = -((cells - position.moves) // 2), (cells + 1 - position.moves) // 2
+        mask = position.masks[0]
+        current = position.masks[position.turn]
+        self.deadline = deadline
+        self.tt.new_search()
+        try:
+            while low < high:
+                middle = low + (high - low) // 2
+                if middle <= 0 and int(low / 2) < middle:
+                    middle = int(low / 2)
+                elif middle >= 0 and high // 2 > middle:
+                    middle = high // 2
+                score = self.negamax(current, mask, position.moves, position.hash, position.turn, rows, cols,
+                                     middle, middle + 1)
+                if score <= middle:
+                    high = score
+                else:
+                    low = score
+        finally:
+            self.deadline = None
+        return low
+
+    def column_score(self, position, col: int, deadline: float = None) -> int:
+        """
+        Prove the value of column 'col' for the player to move.
+
+        :return: exact score of the position after 'col', for the player to move now
+        """
+        if position.is_winning_move(col):
+            return (position.rows * position.cols + 1 - position.moves) // 2
+        position = position.copy()
+        position.play(col)
+        if position.is_full():
+            return 0
+        return -self.solve(position, deadline)
+
+    def best_move(self, position, deadline: float = None):
+        """
+        :param position: bitboard position (Position), not won yet
+        :param deadline: time.perf_counter() value at which the solver gives up (SearchTimeout)
+        :return: (column, exact score) of the best move; ties go to the most central column
+        """
+        best_col, best_score = None, None
+        for col in center_order(position.cols):
+            if position.can_play(col):
+                score = self.column_score(position, col, deadline)
+                if best_score is None or score > best_score:
+                    best_col, best_score = col, score
+        if self.db is not None:
+            self.db.put(position, best_score)
+        return best_col, best_score
+
+    def negamax(self, current, mask, moves, key, player, rows, cols, alpha, beta):
+        """
+        :param current: bitboard of the pieces of the player to move
+        :param mask: bitboard of all pieces
+        :param moves: number of pieces on the board
+        :param key: Zobrist hash of the position
+        :param player: player to move (1 or 2, for the Zobrist keys)
+        :param alpha: lower bound of the search window
+        :param beta: upper bound of the search window
+        :return: score of the position (exact if strictly inside the window, a bound otherwise);
+                 the player to move must not have a winning move
+        """
+        self.nodes += 1
+        if not self.nodes & 1023 and (self.deadline is not None and time.perf_counter() > self.deadline
+                                      or self.stop is not None and self.stop()):
+            raise SearchTimeout()
+        cells = rows * cols
+        bottom_mask, board_mask, _ = board_geometry(rows, cols)
+        possible = (mask + bottom_mask) & board_mask
+        opponent_wins = winning_spots(current ^ mask, mask, rows, cols)
+        forced = possible & opponent_wins
+        if forced:
+            if forced & (forced - 1):
+                # two threats: the opponent wins next move
+                return -((cells - moves) // 2)
+            possible = forced
+        # never play right below a cell the opponent wins on:
+        possible &= ~(opponent_wins >> 1)
+        if not possible:
+            return -((cells - moves) // 2)
+        if moves >= cells - 2:
+            return 0
+
+        # bounds of the score (nobody wins within the next move):
+        lowest = -((cells - 2 - moves) // 2)
+        if alpha < lowest:
+            alpha = lowest
+            if alpha >= beta:
+                return alpha
+        highest = (cells - 1 - moves) // 2
+        entry = self.tt.probe(key)
+        if entry is not None:
+            _, score, flag, _ = entry
+            if flag == UPPER:
+                highest = min(highest, score)
+            elif flag == LOWER:
+                if alpha < score:
+                    alpha = score
+                    if alpha >= beta:
+                        return alpha
+        if beta > highest:
+            beta = highest
+            if alpha >= beta:
+                return beta
+
+        # moves creating the most threats first (then the most central ones):
+        height = rows + 1
+        column_mask = (1 << rows) - 1
+        candidates = []
+        for col in center_order(cols):
+            move = possible & (column_mask << col * height)
+            if move:
+                candidates.append((-popcount(winning_spots(current | move, mask, rows, cols)), len(candidates), move))
+        candidates.sort()
+
+        keys, side_key = zobrist_keys(rows, cols)
+        player_keys = keys[player]
+        opponent = current ^ mask
+        for _, _, move in candidates:
+            score = -self.negamax(opponent, mask | move, moves + 1,
+                                  key ^ player_keys[move.bit_length() - 1] ^ side_key, 3 - player, rows, cols,
+                                  -beta, -alpha)
+            if score >= beta:
+                self.tt.store(key, cells - moves, score, LOWER, None)
+                return score
+            if score > alpha:
+                alpha = score
+        self.tt.store(key, cells - moves, alpha, UPPER, None)
+        return alpha
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    rows, cols = (int(n) for n in (argv[0] if argv else '4x4').split('x'))
+    solver = Solver()
+    start = time.perf_counter()
+    col, score = solver.best_move(Position(rows, cols, 1))
+    print('%dx%d: best first move %d, score %d (%d nodes, %.1f s, stored in %s)'
+          % (rows, cols, col, score, solver.nodes, time.perf_counter() - start, os.path.abspath(SOLVED_DB)))
+    solver.close()
+
+
+if __name__ == '__main__':
+    main()
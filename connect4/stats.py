@@ -0,0 +1,107 @@
+"""
+Search statistics: node counts, cutoffs and timing of one AI move, and cProfile helpers.
+"""
+import cProfile
+import pstats
+
+
+class SearchStats(object):
+    """
+    Class for the statistics of one search (filled in by Engine.search, cheap enough to stay on).
+
+    Methods for:
+    - counters of the search (plain attributes, incremented by minimax)
+    - derived rates (first-move cutoff rate, nodes per second)
+    - merging the statistics of several searches (parallel search)
+    - summary for the terminal / dictionary for logs
+    """
+
+    __slots__ = ('nodes', 'leaves', 'terminals', 'cutoffs', 'first_move_cutoffs', 'tt_hits', 'depth',
+                 'depth_times', 'elapsed', 'book', 'solved', 'forced', 'pondered', 'column', 'score')
+
+    def __init__(self):
+        self.nodes = 0  # nodes visited by minimax
+        self.leaves = 0  # positions evaluated at ply level 0
+        self.terminals = 0  # full boards and winning moves found during the search
+        self.cutoffs = 0  # beta cutoffs
+        self.first_move_cutoffs = 0  # cutoffs caused by the first move searched
+        self.tt_hits = 0  # positions found in the transposition table
+        self.depth = 0  # last completed depth
+        self.depth_times = []  # (depth, seconds, nodes so far) of each completed depth
+        self.elapsed = 0.0  # seconds spent in the search
+        self.book = False  # move taken from the opening book (nothing searched)
+        self.solved = False  # move chosen by the exact solver (nodes are the solver's)
+        self.forced = False  # move found by the tactical pre-check (a win now or the only move; nothing searched)
+        self.pondered = False  # search done in advance, on the opponent's time (see connect4.background)
+        self.column = None  # best move (and its score) of the last completed depth
+        self.score = None
+
+    @property
+    def first_move_cutoff_rate(self) -> float:
+        return self.first_move_cutoffs / self.cutoffs if self.cutoffs else 0.0
+
+    @property
+    def nodes_per_second(self) -> float:
+        return self.nodes / self.elapsed if self.elapsed else 0.0
+
+    def merge(self, other):
+        """
+        Add the counters of 'other' (e.g. the search of one root move by a worker process) to these.
+
+        :param other: SearchStats
+        :return: -
+        """
+        self.nodes += other.nodes
+        self.leaves += other.leaves
+        self.terminals += other.terminals
+        self.cutoffs += other.cutoffs
+        self.first_move_cutoffs += other.first_move_cutoffs
+        self.tt_hits += other.tt_hits
+
+    def as_dict(self) -> dict:
+        values = {name: getattr(self, name) for name in self.__slots__}
+        values['depth_times'] = list(self.depth_times)
+        values['first_move_cutoff_rate'] = self.first_move_cutoff_rate
+        values['nodes_per_second'] = self.nodes_per_second
+        return values
+
+    def __str__(self):
+        if self.book:
+            return 'opening book move'
+        if self.forced:
+            return 'forced move (no search), %.1f ms' % (self.elapsed * 1000)
+        if self.solved:
+            text = 'solved exactly: %d nodes, %.1f ms' % (self.nodes, self.elapsed * 1000)
+        else:
+            depths = ', '.join('%d: %.1f ms' % (depth, seconds * 1000) for depth, seconds, _ in self.depth_times)
+            text = ('depth %d, %d nodes (%.0f nodes/s), %d leaves, %d terminals, %d TT hits, '
+                    '%d cutoffs (%.0f%% on first move), %.1f ms [%s]'
+                    % (self.depth, self.nodes, self.nodes_per_second, self.leaves, self.terminals, self.tt_hits,
+                       self.cutoffs, 100 * self.first_move_cutoff_rate, self.elapsed * 1000, depths))
+        return 'pondered, ' + text if self.pondered else text
+
+
+def profile_call(path: str, function, *args, **kwargs):
+    """
+    Function running function(*args, **kwargs) under cProfile and dumping the profile to 'path'.
+
+    :param path: output file (read it with print_profile, pstats or snakeviz)
+    :return: result of the call
+    """
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(function, *args, **kwargs)
+    finally:
+        profiler.dump_stats(path)
+
+
+def print_profile(path: str, top: int = 20, sort: str = 'cumulative'):
+    """
+    Function printing the 'top' most expensive functions of a profile dumped by profile_call.
+
+    :param path: profile file
+    :param top: number of functions to print
+    :param sort: pstats sort key ('cumulative', 'tottime', 'ncalls', ...)
+    :return: -
+    """
+    pstats.Stats(path).strip_dirs().sort_stats(sort).print_stats(top)
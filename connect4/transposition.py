@@ -0,0 +1,162 @@
+"""
+Fixed-size transposition table for the AI search, keyed by the Zobrist hash of the position,
+in memory or in a memory-mapped file kept between runs (and shared by processes).
+"""
+import mmap
+import os
+import struct
+
+
+# bound types of a stored score:
+EXACT, LOWER, UPPER = 0, 1, 2
+# memory used by the transposition table of each AI (in megabytes):
+TT_MEMORY_MB = 16
+# transposition table files: magic, version, rows, cols, age of the last search, number of slots
+TT_FILE_MAGIC = b'C4TT'
+TT_FILE_VERSION = 1
+TT_FILE_HEADER = struct.Struct('<4sBBBBQ')  # 16 bytes, so the slots stay 8-byte aligned
+
+
+class TranspositionTable(object):
+    """
+    Class for the transposition table of the AI search (fixed size, keyed by Zobrist hash).
+
+    Every slot takes two 64-bit words: the position hash XOR the packed entry, and the packed entry
+    (score + 2^47 on 48 bits | depth + 1 on 7 bits | bound type on 2 bits | best move on 4 bits | age on 3 bits).
+    Storing hash XOR entry makes a slot half-written by another process (see PersistentTranspositionTable)
+    fail the hash check instead of returning a wrong entry.
+
+    Replacement policy: an entry of another position is only overwritten by a search at least
+    as deep, unless it was stored while searching an earlier move (aging).
+
+    Methods for:
+    - initialization (memory cap in megabytes)
+    - looking up a position (probe)
+    - storing a search result (store)
+    - starting the search of a new move (new_search) and clearing the table
+    """
+    SLOT_BYTES = 16
+    SCORE_BIAS = 1 << 47
+    NO_MOVE = 15
+
+    def __init__(self, memory_mb: float = TT_MEMORY_MB):
+        self.size = max(1, int(memory_mb * 1024 * 1024) // self.SLOT_BYTES)
+        self.table = memoryview(bytearray(self.size * self.SLOT_BYTES)).cast('Q')
+        self.age = 0
+        # counters:
+        self.hits = 0
+        self.misses = 0
+        self.collisions = 0
+
+    def clear(self):
+        self.table = memoryview(bytearray(self.size * self.SLOT_BYTES)).cast('Q')
+        self.age = 0
+        self.hits = self.misses = self.collisions = 0
+
+    # entries stored before this call can be replaced by shallower ones:
+    def new_search(self):
+        self.age = (self.age + 1) & 7
+
+    def probe(self, key: int):
+        """
+        :param key: Zobrist hash of the position
+        :return: (depth, score, bound type, best move) or None if the position is not stored
+        """
+        index = (key % self.size) << 1
+        data = self.table[index + 1]
+        if data:
+            if self.table[index] ^ data == key:
+                self.hits += 1
+                move = (data >> 57) & 15
+                return ((data >> 48) & 127) - 1, (data & 0xffffffffffff) - self.SCORE_BIAS, (data >> 55) & 3, \
+                    None if move == self.NO_MOVE else move
+            # slot taken by another position:
+            self.collisions += 1
+        self.misses += 1
+        return None
+
+    def store(self, key: int, depth: int, score: int, flag: int, move):
+        """
+        :param key: Zobrist hash of the position
+        :param depth: remaining ply level of the search
+        :param score: score of the position
+        :param flag: EXACT, LOWER (score is a lower bound) or UPPER (score is an upper bound)
+        :param move: best column found (or None)
+        """
+        index = (key % self.size) << 1
+        old = self.table[index + 1]
+        if old and self.table[index] ^ old != key and old >> 61 == self.age and ((old >> 48) & 127) - 1 > depth:
+            # keep the deeper entry of the current search
+            return
+        data = (score + self.SCORE_BIAS) | (min(depth + 1, 127) << 48) | (flag << 55) | \
+            ((self.NO_MOVE if move is None else move) << 57) | (self.age << 61)
+        self.table[index] = key ^ data
+        self.table[index + 1] = data
+
+
+class PersistentTranspositionTable(TranspositionTable):
+    """
+    Class for a transposition table stored in a memory-mapped file, for one board size.
+
+    The file (header, then the slots) is created with the requested size and never resized;
+    entries are replaced in place, so the table keeps the results of earlier runs. Several processes
+    can map the same file: writes are not locked, and slots torn by concurrent writes are rejected by
+    the hash check (see TranspositionTable).
+
+    Methods for:
+    - opening (or creating) the file of a board size, flushing and closing it
+    - clearing the table (the file is emptied)
+    - same lookups and stores as TranspositionTable
+    """
+
+    def __init__(self, path: str, rows: int, cols: int, memory_mb: float = TT_MEMORY_MB):
+        self.path = path
+        if not os.path.exists(path):
+            size = max(1, int(memory_mb * 1024 * 1024) // self.SLOT_BYTES)
+            with open(path, 'wb') as file:
+                file.write(TT_FILE_HEADER.pack(TT_FILE_MAGIC, TT_FILE_VERSION, rows, cols, 0, size))
+                file.truncate(TT_FILE_HEADER.size + size * self.SLOT_BYTES)
+        with open(path, 'r+b') as file:
+            self.data = mmap.mmap(file.fileno(), 0)
+        magic, version, file_rows, file_cols, age, self.size = TT_FILE_HEADER.unpack_from(self.data, 0)
+        if magic != TT_FILE_MAGIC or version != TT_FILE_VERSION or (file_rows, file_cols) != (rows, cols) \
+                or len(self.data) != TT_FILE_HEADER.size + self.size * self.SLOT_BYTES:
+            self.data.close()
+            raise ValueError('%s is not a transposition table file for a %dx%d board' % (path, rows, cols))
+        self.rows, self.cols = rows, cols
+        self.table = memoryview(self.data)[TT_FILE_HEADER.size:].cast('Q')
+        self.age = age
+        self.hits = self.misses = self.collisions = 0
+
+    def clear(self):
+        self.table[:] = memoryview(bytearray(self.size * self.SLOT_BYTES)).cast('Q')
+        self.age = 0
+        self.hits = self.misses = self.collisions = 0
+        self.write_age()
+
+    def new_search(self):
+        TranspositionTable.new_search(self)
+        self.write_age()
+
+    # the age goes on from one run to the next:
+    def write_age(self):
+        self.data[7] = self.age
+
+    def flush(self):
+        self.data.flush()
+
+    def close(self):
+        self.table.release()
+        self.data.close()
+
+
+def table_path(directory: str, rows: int, cols: int) -> str:
+    return os.path.join(directory, 'tt_%dx%d.bin' % (rows, cols))
+
+
+def open_table(directory: str, rows: int, cols: int, memory_mb: float = TT_MEMORY_MB):
+    """
+    :return: PersistentTranspositionTable of the rows x cols board in 'directory' (created if needed)
+    """
+    os.makedirs(directory, exist_ok=True)
+    return PersistentTranspositionTable(table_path(directory, rows, cols), rows, cols, memory_mb)
@@ -1,23 +1,15 @@
+import os
 import random
-import time
-from turtle import left
-import pygame
 import numpy as np
-from tkinter import *  # for buttons
 
-# reading input from input file:
-with open('4inaROW.txt', 'r') as file:
-    content = file.read()
-    OPPONENT, ROWS, COLS, FIRST_PLAYER = content.split()
-    ROWS, COLS = int(ROWS), int(COLS)
-    # print("OPPONENT =", OPPONENT, ', ROWS = ', ROWS, ', COLS = ', COLS, ', FIRST PLAYER = ', FIRST_PLAYER)
-    assert 4 <= ROWS <= 10 and 4 <= COLS <= 10, 'Board must be at least 4x4 and at most 9x9.'
+from connect4 import BackgroundSearch, Engine, GameState, OpeningBook, Solver, read_config
+from connect4.records import GAMES_LOG, UNFINISHED, GameLog
+from connect4.transposition import open_table
+from connect4.board import print_board
+from connect4.search import DIFFICULTIES
 
-file.close()
-# print("FIRST_PLAYER ", FIRST_PLAYER)
-
-# available free cells:
-FREE_CELLS = ROWS * COLS
+# GUI library, imported by setup() (the 'connect4' engine package never needs it):
+pygame = None
 
 # RGB colours
 YELLOW = (255, 230, 5)
@@ -25,239 +17,126 @@ RED = (204, 0, 0)
 BLUE = (0, 128, 255)
 BLACK = (0, 0, 0)
 WHITE = (230, 230, 230)
+# colour of the pieces of each player (board value 1: human/player 1, 2: computer/player 2):
+COLOURS = (None, YELLOW, RED)
 
-# Initialize the pygame
 SQUARE_SIZE = 100
-WINDOW_SIZE = (SQUARE_SIZE * COLS, SQUARE_SIZE * (ROWS + 1))
-H = (ROWS + 1) * SQUARE_SIZE
-W = COLS * SQUARE_SIZE
 RADIUS = SQUARE_SIZE // 2 - 5  # error
-
-pygame.init()
 TITLE = 'Connect-Four Game'
-icon = pygame.image.load('connect4.png')  # icon
-pygame.display.set_icon(icon)
-screen = pygame.display.set_mode(WINDOW_SIZE)  # set window size
-screen.fill(WHITE)  # set background colour to white
-pygame.display.set_caption(TITLE)  # set title of the window
-# # clock = pygame.time.Clock()  # create clock so that game doesn't refresh that often
-# music_file = 'Su Turno.ogg'
-# pygame.mixer.init()
-# pygame.mixer.music.load(music_file)
-# pygame.mixer.music.play(-1)  # If the loops is -1 then the music will repeat indefinitely.
-FONT = pygame.font.Font(None, 32)
-
-number_of_moves = 0
-
-
-class Piece(object):
+# frame rate of the animations (the main loop sleeps until the next event when nothing moves):
+FPS = 60
+# acceleration of a falling piece (pixels per second squared):
+FALL_ACCELERATION = 60 * SQUARE_SIZE
+# delays (in milliseconds) before the AI moves and before the window closes once the winner is shown:
+AI_DELAY_MS = 300
+END_DELAY_MS = 2000
+
+# game settings (see setup):
+OPPONENT, ROWS, COLS, FIRST_PLAYER = None, 0, 0, None
+# game being played (connect4.GameState: board, player to move, moves, winner; see setup):
+game = None
+# file name to profile the AI moves in (cProfile, the last move's profile is kept), e.g. CONNECT4_PROFILE=ai.prof:
+PROFILE_PATH = os.environ.get('CONNECT4_PROFILE')
+# directory to keep the AI's transposition tables in between runs (one file per board size), e.g. CONNECT4_TT=tt:
+TT_DIRECTORY = os.environ.get('CONNECT4_TT')
+# the medium and hard AI ponder (search the answers to the human's replies) on the human's time,
+# unless CONNECT4_PONDER=0:
+PONDER = os.environ.get('CONNECT4_PONDER') != '0'
+# log every game is appended to (connect4.records), e.g. CONNECT4_GAMES=games.c4log; empty: games aren't recorded
+GAMES_PATH = os.environ.get('CONNECT4_GAMES', GAMES_LOG)
+
+
+def setup(config):
     """
-    Class for game board piece.
+    Function initializing the pygame window and the game for the given settings.
+    Nothing is read, initialized or displayed when this module is imported.
 
-    Methods for for:
-    - initialization
-    - GUI representation of piece
-    - virtual board update after one of the two players drops piece
+    :param config: game settings (connect4.GameConfig)
+    :return: -
     """
-
-    def __init__(self, my_colour, board):
-        self.colour = my_colour
-        self.board = board
-
-    # draw coloured piece at position (row_count, col_count):
-    def draw_piece(self, circle_colour, row_count, col_count):
-        pygame.draw.circle(screen, circle_colour,
-                           (col_count * SQUARE_SIZE + SQUARE_SIZE // 2,
-                            row_count * SQUARE_SIZE + SQUARE_SIZE // 2 + SQUARE_SIZE),
-                           RADIUS)
-        pygame.display.update()
-
-    # update board after dropping piece at position (row_count, col_count):
-    def drop_piece(self, board, player_colour: (int, int, int), row_count: int, col_count: int):
-        # 1 for player, 2 for CPU
-        if player_colour == YELLOW:
-            board[row_count][col_count] = 1
-        elif player_colour == RED:
-            board[row_count][col_count] = 2
-
-
-"""_______________________ GENERAL USE FUNCTIONS __________________ """
-
-
-# function for random.shuffle()
-def randomize():
-    return 0.225
-
-
-# get next free row on column col
-def next_free_row_on_col(board, column):
-    last = -1
-    for i in range(ROWS):
-        if board[i][column] == 0:
-            last = i
-    return last  # -1 if column is full
-
-
-# remaining available moves (columns):
-def get_available_moves(board):
-    available_cols = []
-    for col_count in range(COLS):
-        if next_free_row_on_col(board, col_count) != -1:
-            available_cols.append(col_count)
-    return available_cols
-
-
-# decrement value:
-def decrement(value: int):
-    return value - 1
-
-
-# increment value:
-def increment(value: int):
-    return value + 1
-
-
-# variable for determining who won the game:
-# 1 - human
-# 2 - computer/player2
-# 0 - tie
-winner = 0
-
-
-# checks whether current state is final state:
-def check_win(board, player_colour: (int, int, int)) -> bool:
+    global pygame, OPPONENT, ROWS, COLS, FIRST_PLAYER, DIFFICULTY, WINDOW_SIZE, H, W, screen, FONT, game_board, game, \
+        AI_TURN_EVENT, AI_SEARCH_EVENT, GAME_OVER_EVENT
+    import pygame
+
+    OPPONENT, ROWS, COLS, FIRST_PLAYER = config.opponent, config.rows, config.cols, config.first_player
+    # level of difficulty of the AI (None: chosen in a dialog when the game starts)
+    DIFFICULTY = config.difficulty
+
+    # Initialize the pygame
+    WINDOW_SIZE = (SQUARE_SIZE * COLS, SQUARE_SIZE * (ROWS + 1))
+    H = (ROWS + 1) * SQUARE_SIZE
+    W = COLS * SQUARE_SIZE
+
+    pygame.init()
+    icon = pygame.image.load('connect4.png')  # icon
+    pygame.display.set_icon(icon)
+    screen = pygame.display.set_mode(WINDOW_SIZE)  # set window size
+    screen.fill(WHITE)  # set background colour to white
+    pygame.display.set_caption(TITLE)  # set title of the window
+    # timer events of the main loop (AI's turn, end of the game), and messages of the background AI search:
+    AI_TURN_EVENT = pygame.event.custom_type()
+    GAME_OVER_EVENT = pygame.event.custom_type()
+    AI_SEARCH_EVENT = pygame.event.custom_type()
+    # music_file = 'Su Turno.ogg'
+    # pygame.mixer.init()
+    # pygame.mixer.music.load(music_file)
+    # pygame.mixer.music.play(-1)  # If the loops is -1 then the music will repeat indefinitely.
+    FONT = pygame.font.Font(None, 32)
+
+    # gameBoard object:
+    game_board = GameBoard()
+
+    # new game, with the first player to move:
+    game = GameState(ROWS, COLS, config.first_turn)
+
+
+def make_ai(difficulty: str, rows: int, cols: int):
     """
-    Method that checks whether the player with colour 'player_colour' has made a winning move.
+    Function building the AI player of the medium or hard level, in the process of its background search.
+    Medium and hard play the first moves from the opening book, if any; hard solves the endgames exactly.
 
-    :param board: virtual board
-    :param player_colour: colour for player (YELLOW for player1, RED for player2/computer)
-    :return: boolean value (true if player_colour wins, false otherwise)
+    :param difficulty: 'medium' or 'hard'
+    :return: AI object
     """
-    global winner
-
-    def get_board_value(our_colour: (int, int, int)):
-        """
-        Method getting the board value of the player depending on their discs' colour.
-
-        :param our_colour: colour
-        :return: board value
-        """
-        if our_colour == RED:
-            return 2
-        elif our_colour == YELLOW:
-            return 1
-        else:
-            raise TypeError("not a valid player")
+    book = OpeningBook.for_size(rows, cols)
+    # (with CONNECT4_TT, the transposition table is kept in a file that warms up from game to game)
+    tt = open_table(TT_DIRECTORY, rows, cols) if TT_DIRECTORY else None
+    ply, time_budget_ms = DIFFICULTIES[difficulty]
+    # up to 3 plies for medium difficulty AI, up to 7 plies then perfect endgames for hard:
+    return AI(ply, time_budget_ms, book, Solver() if difficulty == 'hard' else None, tt)
 
-    # get board value for next 3 function calls:
-    value = get_board_value(player_colour)
 
-    # horizontally:
-    def horizontal_win() -> bool:
-        """
-        for each row, check whether there are 4 consecutive pieces of the same colour:
-        :return: bool
-        """
-        for col in range(COLS - 3):
-            for row in range(ROWS):
-                if board[row][col] == board[row][col + 1] == board[row][col + 2] == board[row][col + 3] == value:
-                    return True
-        # if no row has 4 consecutive identical pieces:
-        return False
-
-    # vertically:
-    def vertical_win() -> bool:
-        """
-        check whether there are 4 identical pieces on a column:
-        :return: bool
-        """
-        for row in range(ROWS - 3):
-            for col in range(COLS):
-                if board[row][col] == board[row + 1][col] == board[row + 2][col] == board[row + 3][col] == value:
-                    return True
-        return False
-
-    # diagonally:
-    def diagonal_win() -> bool:
-        """
-        check whether there are 4 identical pieces on diagonals
-        :return: bool
-        """
-        def get_all_diagonals():
-            # get main diagonals:
-            diags = [board[::-1, :].diagonal(i) for i in range(-board.shape[0] + 1, board.shape[1])]
-            # get secondary diagonals:
-            diags.extend(board.diagonal(i) for i in range(board.shape[1] - 1, -board.shape[0], -1))
-            # make list:
-            diags_list = []
-            for i in diags:
-                diags_list.append(list(i))
-            return diags_list
-
-        # all board diagonals:
-        diagonals = get_all_diagonals()
-
-        # parse all diagonals to check for 4 identical pieces:
-        for diag_i in diagonals:
-            # print(diag_i, "  :  ", end='')
-            for elem in range(len(diag_i) - 3):
-                # print(diag_i[elem], end='; ')
-                if diag_i[elem] == diag_i[elem + 1] == diag_i[elem + 2] == diag_i[elem + 3] == value:
-                    return True
-        return False
-
-    # at least one type of win has to be true for player 'colour' to win:
-    if horizontal_win() or vertical_win() or diagonal_win():
-        winner = value
-        return True
-    return False
-
-
-# game is over when one colour wins (or when table is full):
-def is_game_over(board) -> bool:
-    """
-    :param board: virtual board
-    :return: boolean value (true if either player wins or if there are no moves left, false otherwise)
-    """
-    return check_win(board, RED) or check_win(board, YELLOW) or FREE_CELLS == 0
-
-
-# printing board in terminal:
-def print_board(board):
-    for i in range(ROWS):
-        for j in range(COLS):
-            if j < COLS - 1:
-                print(int(board[i][j]), end='|')
-            else:
-                print(int(board[i][j]))
-    print('\n')
+"""_______________________ GENERAL USE FUNCTIONS __________________ """
 
 
-def print_winner_terminal():
+def print_winner_terminal(state: GameState):
     """
     Function for printing in terminal winner of the game and returning colour and text for GUI text box.
+    :param state: finished game
     :return: color_fill (RGB code), text to print in GUI
     """
+    winner = state.winner
+    score = '%d - %d' % (state.pieces(1), state.pieces(2))
     if winner == 0:
-        print('Tie!\nScore: ', human.score, '-', computer.score, 'Free cells: ', FREE_CELLS)
+        print('Tie!\nScore: ', score, 'Free cells: ', state.free_cells)
         color_fill = YELLOW
         text_box: str = "Tie! You were so close."
     elif OPPONENT == 'human':
         if winner == 1:
-            print('Player 1 (yellow) won!\nScore:', human.score, '-', computer.score, '\nFree cells: ', FREE_CELLS)
+            print('Player 1 (yellow) won!\nScore:', score, '\nFree cells: ', state.free_cells)
             color_fill = RED
             text_box: str = "Player 1 (yellow) wins! Congratulations!"
         else:  # if winner == 2
-            print('Player 2 (red) won! !\nTotal score:', human.score, '-', computer.score, '\nFree cells: ', FREE_CELLS)
+            print('Player 2 (red) won! !\nTotal score:', score, '\nFree cells: ', state.free_cells)
             color_fill = BLACK
             text_box: str = "Player 2 wins! Congratulations!"
     else:
         if winner == 1:
-            print('You won!\nScore:', human.score, '-', computer.score, '\nFree cells: ', FREE_CELLS)
+            print('You won!\nScore:', score, '\nFree cells: ', state.free_cells)
             color_fill = RED
             text_box: str = "You won! Congratulations!"
         else:  # if winner == 2
-            print('AI won! \nTotal score:', human.score, '-', computer.score, '\nFree cells: ', FREE_CELLS)
+            print('AI won! \nTotal score:', score, '\nFree cells: ', state.free_cells)
             color_fill = BLACK
             text_box: str = "AI won! Better luck next time."
     return color_fill, text_box
@@ -292,9 +171,9 @@ class GameBoard(object):
     Class for GUI.
 
     Methods for:
-    - initialization
-    - resetting virtual board to all 0s
-    - GUI representation of virtual board and its pieces at a given time
+    - initialization (pre-rendered board surface and cell sprites)
+    - restarting (nothing drawn yet)
+    - GUI representation of the board of a game and its pieces at a given time (only the cells that changed)
 
     """
     global ROWS, COLS, SQUARE_SIZE
@@ -303,439 +182,262 @@ class GameBoard(object):
     def __init__(self):
         self.rows = ROWS
         self.cols = COLS
-        self.board = np.zeros((ROWS, COLS))
         self.font = pygame.font.SysFont('Calibri', 32)
+        # one sprite per cell value (free, human, CPU): blue square with a white/yellow/red disc
+        self.sprites = []
+        for circle_colour in (WHITE, YELLOW, RED):
+            sprite = pygame.Surface((SQUARE_SIZE, SQUARE_SIZE))
+            sprite.fill(BLUE)
+            pygame.draw.circle(sprite, circle_colour, (SQUARE_SIZE // 2, SQUARE_SIZE // 2), RADIUS)
+            self.sprites.append(sprite)
+        # empty board, drawn once per game (or after the screen was cleared):
+        self.background = pygame.Surface((COLS * SQUARE_SIZE, ROWS * SQUARE_SIZE))
+        for row_count in range(ROWS):
+            for col_count in range(COLS):
+                self.background.blit(self.sprites[0], (col_count * SQUARE_SIZE, row_count * SQUARE_SIZE))
+        # board as it is on screen (None: nothing drawn yet)
+        self.drawn = None
 
     # restart:
     def restart(self):
-        self.board = np.zeros((ROWS, COLS))  # board is free again
+        self.drawn = None
+
+    # draw the whole board again on the next draw_board (e.g. after the screen was cleared):
+    def invalidate(self):
+        self.drawn = None
 
     # draw board and its coloured pieces
-    def draw_board(self):
-        for row_count in range(ROWS):
-            for col_count in range(COLS):
-                pygame.draw.rect(screen, BLUE,
-                                 (col_count * SQUARE_SIZE, row_count * SQUARE_SIZE + SQUARE_SIZE, SQUARE_SIZE,
-                                  SQUARE_SIZE))
-                circle_colour = (0, 0, 0)
-                if self.board[row_count][col_count] == 0:  # free cell
-                    circle_colour = WHITE
-                elif self.board[row_count][col_count] == 1:  # human player
-                    circle_colour = YELLOW
-                elif self.board[row_count][col_count] == 2:  # CPU player
-                    circle_colour = RED
-                # initializing game_board.board piece with circle_colour
-                board_piece = Piece(circle_colour, self.board)
-                board_piece.draw_piece(circle_colour, row_count, col_count)
-        # update display:
-        pygame.display.update()
-
-
-# gameBoard object:
-game_board = GameBoard()
-
-
-class Player(object):
+    def draw_board(self, state: GameState):
+        """
+        Redraw the cells of the game 'state' that changed since the last call, with a single screen update
+        for all of them.
+        """
+        board = state.board
+        if self.drawn is None:
+            screen.blit(self.background, (0, SQUARE_SIZE))
+            self.drawn = np.zeros((ROWS, COLS))
+            dirty = [screen.get_rect()]  # whole window, with the top row
+        else:
+            dirty = []
+        for row_count, col_count in np.argwhere(board != self.drawn):
+            dirty.append(screen.blit(self.sprites[board[row_count][col_count]],
+                                     (col_count * SQUARE_SIZE, row_count * SQUARE_SIZE + SQUARE_SIZE)))
+        if dirty:
+            self.drawn = np.copy(board)
+            # update display:
+            pygame.display.update(dirty)
+
+
+# class for AI player (the search itself is connect4.Engine):
+class AI(Engine):
     """
-    Class for player.
-
+    Class for AI implementation.
     Methods for:
     - initialization
-    - incrementing score
+    - player making move on a game
+    (search, minimax and score computation are inherited from connect4.Engine)
 
     """
 
-    def __init__(self, player_colour, score, ply):  #: (int, int, int), score: int, ply: int):
-        self.colour = player_colour
-        self.score = score
-        # self.strategy = strategy
-        self.ply = ply  # for algorithms
-
-    def inc_score(self):
-        self.score += 1
-
+    def __init__(self, ply: int, time_budget_ms: int = None, book: OpeningBook = None, solver: Solver = None,
+                 tt=None):
+        Engine.__init__(self, ply, time_budget_ms=time_budget_ms, profile_path=PROFILE_PATH, book=book,
+                        solver=solver, tt=tt)
 
-# player 2 (either human or computer):
-computer = Player(RED, 0, 3)  # colour = RED, score = 0
-# player 1 (always human):
-human = Player(YELLOW, 0, 3)  # colour = YELLOW, score = 0
+    # make move (the player to move drops a piece in column 'col'; returns the row it lands on):
+    @staticmethod
+    def make_move(state: GameState, col: int) -> int:
+        return state.play(col)
 
-# initializing first player:
-if FIRST_PLAYER == 'human':
-    turn = 1
-    colour = YELLOW
-elif FIRST_PLAYER == 'computer':
-    turn = 2
-    colour = RED
+    """ ___________________ BLOCK OPPONENT WINNING MOVE ______________"""
 
+    def block_winning_move(self, state: GameState):
+        """
+        Method that helps AI determine the possible winning move of human player and blocks it
+        (the search does the same check on every position: see connect4.search.tactical_moves).
 
-def switch_player(player_colour: (int, int, int), player_turn: int):
-    """
-    :param player_colour: colour piece of current player (RED or YELLOW)
-    :param player_turn: integer representing whose turn it is (either 1 or 2)
-    :return: switched parameter values
-    """
-    player_turn = 3 - player_turn
-    if player_colour == RED:
-        player_colour = YELLOW
-    else:
-        player_colour = RED
-    return player_colour, player_turn
+        :param state: game, AI to move
+        :return: column the opponent would win on next move (None if there is none)
+        """
+        blocks = state.position.threats()[1]
+        return state.position.column_of(blocks) if blocks else None
 
 
-# has the game finished?
-running = True
+"""_______________________ MAIN LOOP __________________ """
 
 
-# class for AI (superclass for levels of difficulty):
-class AI(object):
+class FallingPiece(object):
     """
-    Class for AI implementation.
-    Methods for:
-    - initialization
-    - end of recursion (returns boolean)
-    - player making move on virtual board
-    - determining best move
-    - computing score for player (returns int)
-    - final state (returns bool)
-    - event handler for when it's human's turn
-    - minimax for AI
+    Class for the animation of a piece falling down its column (driven by the main loop's clock).
 
+    Methods for:
+    - initialization (column, landing row, colour)
+    - moving the piece by the time elapsed since the last frame
+    - GUI representation of the column with the piece over it
     """
-    global running, computer, human, turn, colour, FREE_CELLS
-
-    def __init__(self, ply: int, player: Player):
-        self.ply = ply
-        self.player = player  # corresponding to CPU (for score etc.)
-        self.board = np.copy(game_board.board)
 
-    # make move (player of colour 'player' drops piece in column 'col'):
-    @staticmethod
-    def make_move(board, col, player):
-        row = next_free_row_on_col(board, col)
-        board[row][col] = player  # 1 for human, 2 for CPU
-
-    # compute score for player at a given time:
-    def compute_score(self, board, piece: int) -> int:
-        """
-        Function computing the board score for player 'piece' as follows:
-
-        ________________ RULES__________________
-        player:
-
-        4-piece sequence --> player_score += 1000
-        3-piece sequence --> player_score += 500
-        2-piece sequence --> player_score += 200
-
-        player_score += 10 for each piece in the center
+    def __init__(self, col: int, row: int, piece_colour: (int, int, int)):
+        self.col = col
+        self.row = row  # row the piece lands on
+        self.colour = piece_colour
+        self.y = SQUARE_SIZE // 2  # centre of the piece, starting in the top (hover) row
+        self.speed = 0.0  # pixels per second
+        self.target = (row + 1) * SQUARE_SIZE + SQUARE_SIZE // 2
+
+    # move the piece by dt seconds of free fall (returns True once it has landed):
+    def update(self, dt: float) -> bool:
+        self.speed += FALL_ACCELERATION * dt
+        self.y = min(self.target, self.y + self.speed * dt)
+        return self.y >= self.target
+
+    # redraw the column (board cells and the piece on top of them) and return its rect:
+    def draw(self):
+        column = pygame.Rect(self.col * SQUARE_SIZE, 0, SQUARE_SIZE, H)
+        pygame.draw.rect(screen, WHITE, (column.x, 0, SQUARE_SIZE, SQUARE_SIZE))
+        for row_count in range(ROWS):
+            screen.blit(game_board.sprites[game.board[row_count][self.col]],
+                        (column.x, row_count * SQUARE_SIZE + SQUARE_SIZE))
+        pygame.draw.circle(screen, self.colour, (column.x + SQUARE_SIZE // 2, int(self.y)), RADIUS)
+        return column
 
-        opponent:
-        3-piece sequence --> player_score -= 400
-        __________________________
 
-        :param board: virtual board
-        :param piece: board value for player
-        """
+# hand a message of the background AI search over to the main loop (called from the search's reader thread):
+def post_search_message(message):
+    pygame.event.post(pygame.event.Event(AI_SEARCH_EVENT, message=message))
 
-        def compute_score_for_length(seq_length: int):
-            """
-            Implementing the rules above.
-
-            :param seq_length: length of sequence
-            :return: score as integer
-            """
-            total = 0  # score
-            if seq_length == 2:
-                total += 200
-            elif seq_length == 3:
-                total += 500
-            elif seq_length == 4:
-                total += 1000
-            return total
-
-        # horizontally:
-        def horizontal_score(val: int):
-            opp_max_horizontal = 1
-            total = 0
-            for row_ in range(ROWS):
-                opp_length = 1
-                seq_length = 1
-                for col in range(COLS - 1):
-                    if board[row_][col] == board[row_][col + 1] == val:
-                        seq_length += 1
-                    else:
-                        total += compute_score_for_length(seq_length)
-                        seq_length = 1
-                    # for opponent:
-                    if board[row_][col] == board[row_][col + 1] == 3 - val:
-                        opp_length += 1
-                    else:
-                        if opp_length > opp_max_horizontal:
-                            opp_max_horizontal = opp_length
-                            opp_length = 1
-            return total, opp_max_horizontal
-
-        # vertically:
-        def vertical_score(val: int):
-            opp_max_vertical = 1
-            total = 0
-            for col in range(COLS):
-                opp_length = 1  # length for opponent sequence
-                seq_length = 1  # length for player sequence
-                for row_ in range(ROWS - 1):
-                    if board[row_][col] == board[row_ + 1][col] == val:
-                        seq_length += 1
-                    else:
-                        total += compute_score_for_length(seq_length)
-                        seq_length = 1
-                    # for opponent:
-                    if board[row_][col] == board[row_ + 1][col] == 3 - val:
-                        opp_length += 1
-                    else:
-                        if opp_length > opp_max_vertical:
-                            opp_max_vertical = opp_length
-                            opp_length = 1
-            return total, opp_max_vertical
-
-        # diagonally:
-        def diagonal_score(val):
-            total = 0
-            opp_max_diag = 1
-
-            def get_all_diagonals():
-                # main diagonals:
-                diags = [self.board[::-1, :].diagonal(i) for i in range(-self.board.shape[0] + 1, self.board.shape[1])]
-                # secondary diagonals:
-                diags.extend(self.board.diagonal(i) for i in range(self.board.shape[1] - 1, -self.board.shape[0], -1))
-                diags_list = []
-                for i in diags:
-                    diags_list.append(list(i))
-                return diags_list  # as list
-
-                # all board diagonals:
-
-            diagonals = get_all_diagonals()
-
-            # parse all diagonals to check for 4 identical pieces:
-            for diag_i in diagonals:
-                seq_length = 1
-                opp_diag = 1
-                for elem in range(len(diag_i) - 1):
-                    if diag_i[elem] == diag_i[elem + 1] == val:
-                        seq_length += 1
-                    else:
-                        total += compute_score_for_length(seq_length)
-                        seq_length = 1
-                    # for opponent:
-                    if diag_i[elem] == diag_i[elem + 1] == 3 - val:
-                        opp_diag += 1
-                    else:
-                        if opp_diag > opp_max_diag:
-                            opp_max_diag = opp_diag
-                            opp_diag = 1
-            return total, opp_max_diag
-
-        # individual scores for vertical, horizontal and diagonal approaches:
-        horizontal, opp_max_hor = horizontal_score(piece)
-        vertical, opp_max_vert = vertical_score(piece)
-        diagonal, opp_max_diagonal = diagonal_score(piece)
-
-        middle_count = 0
-        for row in range(ROWS):
-            if board[row][(COLS-1)//2] == 3 - piece:
-                middle_count += 1
-        # sequence of maximum length made by opponent:
-        max_opponent_sequence = max(opp_max_hor, opp_max_vert, opp_max_diagonal)
-        return horizontal + vertical + diagonal + middle_count * 100 if max_opponent_sequence < 3 \
-            else horizontal + vertical + diagonal - 400
-
-    """ ________________________ HANDLE EVENTS _______________________"""
-
-    # event handler for human player:
-    @staticmethod
-    def human_handle_events(board):
-        global running, turn, colour, FREE_CELLS, number_of_moves
 
-        for event in pygame.event.get():  # the event loop
-            if event.type == pygame.QUIT:
-                running = False
-                exit()
-            # if it's player's turn:
-            if turn == 1 and colour == YELLOW:
-                # if mouse click:
-                if event.type == pygame.MOUSEBUTTONUP or event.type == pygame.MOUSEBUTTONDOWN and event.button == left:
-                    # piece is dropped; update board
-                    row = event.pos[0]
-                    # get virtual board column of dropped piece:
-                    col = row // SQUARE_SIZE
-                    # get #row where piece is dropped:
-                    drop_on_row = next_free_row_on_col(board, col)
-                    piece = Piece(colour, board)
-                    # update board:
-                    if drop_on_row != -1:  # if column is not empty and piece can be dropped:
-                        piece.drop_piece(board, colour, drop_on_row, col)  # drop piece
-                        FREE_CELLS = decrement(FREE_CELLS)  # update number of board free cells
-                        game_board.draw_board()  # update GUI board
-                        print_board(board)  # print board
-                        colour, turn = switch_player(colour, turn)  # switch players
-                        # update score:
-                        human.inc_score()
-                    # update real board:
-                    game_board.board = np.copy(board)
-                    # wait 0.3 seconds before AI makes its move:
-                    time.sleep(0.3)
-
-                # if mouse is moving, make ball appear like it's in motion:
-                elif event.type == pygame.MOUSEMOTION:
-                    # position to drop piece:
-                    row = event.pos[0]
-                    # moving piece to drop:
-                    pygame.draw.rect(screen, WHITE, (0, 0, SQUARE_SIZE * COLS, SQUARE_SIZE))
-                    # modificarea cerută: cercul să fie albastru, cu dimensiunea redusă cu 20%
-                    pygame.draw.circle(screen, BLUE, (row, SQUARE_SIZE // 2), RADIUS - RADIUS*0.2)
-
-                # update window:
-                pygame.display.update()
+def record_game(state: GameState):
+    """
+    Append a game to the games log (GAMES_PATH), unless recording is off.
+    A game that is not over (e.g. the window was closed during the game) is recorded as UNFINISHED.
+    """
+    if GAMES_PATH:
+        with GameLog(GAMES_PATH) as log:
+            log.append(state.rows, state.cols, state.first_player, state.winner if state.over else UNFINISHED,
+                       state.position.stack)
 
-    """ ___________________ BLOCK OPPONENT WINNING MOVE ______________"""
 
-    def block_winning_move(self, board, opp_winning_col):
-        """
-        Method that helps AI determine the possible winning move of human player and blocks it.
-        """
-        pass
+def draw_hover(x: int):
+    """
+    Draw the piece the human player is about to drop, above column x (in pixels), in the top row.
+    """
+    pygame.draw.rect(screen, WHITE, (0, 0, SQUARE_SIZE * COLS, SQUARE_SIZE))
+    if OPPONENT == 'human':
+        pygame.draw.circle(screen, COLOURS[game.turn], (x, SQUARE_SIZE // 2), RADIUS)
+    else:
+        # modificarea cerută: cercul să fie albastru, cu dimensiunea redusă cu 20%
+        pygame.draw.circle(screen, BLUE, (x, SQUARE_SIZE // 2), RADIUS - RADIUS*0.2)
+    pygame.display.update((0, 0, SQUARE_SIZE * COLS, SQUARE_SIZE))  # top row only
 
-    """ ___________________________ MINIMAX __________________________"""
 
-    def minimax(self, board, ply_level, alpha, beta, max_player):
-        """
-        :param board: virtual board game
-        :param ply_level: current ply level
-        :param alpha:
-        :param beta:
-        :param max_player: maximizing player (1 for human, 2 for computer)
-        :return: new game state
-        """
-        # first, get available moves:
-        global FREE_CELLS, turn
-        available_columns = get_available_moves(board)
-        # for better randomization:
-        random.shuffle(available_columns, randomize)
-
-        # is end of recursion?
-        # if either player wins:
-        if is_game_over(board):
-            if check_win(board, YELLOW):  # player wins
-                # print("yellow wins")
-                return -100000000000000, None
-            elif check_win(board, RED):  # computer wins
-                # print("red wins")
-                return 100000000000000, None
-            elif not FREE_CELLS:
-                # tie
-                return 0, None
-        # else, if we reach ply level 0:
-        elif ply_level < 1:
-            return self.compute_score(board, 2), None  # return AI score
-
-        # maximizing player's turn:
-        if turn == max_player:
-            column, score = random.choice(board), -100000000000000
-            random.shuffle(available_columns, randomize)
-            for col_ in available_columns:
-                row_ = next_free_row_on_col(board, col_)
-                copy_board = np.copy(board)
-                assert turn in [1, 2], "Error recognizing player turn."
-                my_colour = RED if turn == 2 else YELLOW
-                piece = Piece(my_colour, copy_board)
-                piece.drop_piece(copy_board, my_colour, row_, col_)
-                FREE_CELLS = decrement(FREE_CELLS)
-                new_score = self.minimax(copy_board, ply_level - 1, alpha, beta, 3 - max_player)[0]
-                FREE_CELLS = increment(FREE_CELLS)
-                # maximizing alpha:
-                if new_score > score:
-                    score = new_score
-                    column = col_
-                alpha = max(alpha, score)
-                if alpha >= beta:
-                    break
-            return column, score
-
-        # minimizing player's turn:
-        else:
-            column, score = random.choice(board), 100000000000000
-            for col_ in available_columns:
-                row_ = next_free_row_on_col(board, col_)
-                copy_board = np.copy(board)
-                assert turn in [1, 2], "Error recognizing player turn."
-                my_colour = RED if turn == 2 else YELLOW
-                piece = Piece(my_colour, copy_board)
-                piece.drop_piece(copy_board, my_colour, row_, col_)
-                FREE_CELLS = decrement(FREE_CELLS)
-                new_score = self.minimax(copy_board, decrement(ply_level), alpha, beta, 3 - max_player)[0]
-                # complementary operation (recursion):
-                FREE_CELLS = increment(FREE_CELLS)
-                # minimizing beta:
-                if new_score < score:
-                    score = new_score
-                    column = col_
-                beta = min(beta, score)
-                if alpha >= beta:
-                    break
-            return column, score
-
-
-"""
-AI objects for each level of difficulty:
-"""
-AI_easy_player = AI(0, computer)  # 0 because we don't use minimax
-AI_medium_player = AI(3, computer)  # 3 for medium difficulty AI
-AI_hard_player = AI(5, computer)  # 5 plies for high difficulty AI
-
-
-def AI_game_human_turn(difficulty_level: str):
+def main_loop(choose_ai_move=None, background: BackgroundSearch = None, fps: int = FPS):
     """
-    Method for implementing human's turn in Connect-4 game against AI of one of 3 levels of difficulty.
-
-    :param difficulty_level: level of difficulty (type int)
+    Central game loop: human moves (mouse), AI moves, falling-piece animation and end of the game.
+
+    The loop runs at 'fps' frames per second (pygame Clock) while a piece is falling; otherwise it sleeps
+    until the next event, so waiting for a click takes no CPU. Delays are timers posting events to the loop
+    (AI_TURN_EVENT before the AI moves, GAME_OVER_EVENT after the winner was shown), never time.sleep.
+    A background search reports through AI_SEARCH_EVENT (progress in the window title, then the move),
+    ponders while the human thinks (if PONDER) and is cancelled when the loop ends (e.g. when the window
+    is closed).
+
+    :param choose_ai_move: function returning the column of the AI's move right away
+    :param background: AI searching in a background process (neither: two human players)
+    :param fps: frame rate of the animation
     :return: -
     """
-    global running, turn, colour, game_board, FREE_CELLS, screen, number_of_moves
-    game_board.draw_board()
-    if difficulty_level.lower() == 'easy':
-        AI_easy_player.human_handle_events(game_board.board)
-    elif difficulty_level.lower() == 'medium':
-        AI_medium_player.human_handle_events(game_board.board)
-    elif difficulty_level.lower() == 'hard':
-        AI_hard_player.human_handle_events(game_board.board)
-    # stop condition:
-    if is_game_over(game_board.board):
-        # check who won:
-        color_fill = WHITE
-        if winner == 0:
-            print('Tie!\nScore: ', human.score, '-', computer.score)
-            text_box: str = "It's a tie!"
-        elif winner == 1:
-            print('You won!\nScore:', human.score, '-', computer.score)
-            text_box: str = "You won! Congratulations!"
-        else:  # if winner == 2
-            print('You lost!\nTotal score:', human.score, '-', computer.score)
-            text_box: str = "You lost!"
-        # update GUI board:
-        screen.fill(color_fill)  # set background colour to white
-        pygame.display.set_caption(TITLE)  # set title of the window
-
-        # show winner in GUI:
-        winner_box = BoxMessage(H // 3, W // 3, W / 2, 32, text_box)
-        winner_box.draw()
-        pygame.display.update()
-        time.sleep(2)  # sleep for two seconds after showing winner
-
-        # stop program from running:
-        running = False
+    clock = pygame.time.Clock()
+    running = True
+    falling = None  # piece being dropped (FallingPiece)
+    game_board.draw_board(game)
+
+    def ai_to_move():
+        return (choose_ai_move is not None or background is not None) and game.turn == 2
+
+    def human_to_move():
+        if background is not None and PONDER:
+            # search the AI's answers to the human's possible moves in the meantime
+            # (a copy: the position is sent to the search process after this returns)
+            background.ponder(game.position.copy())
+
+    def drop(col):
+        nonlocal falling
+        if game.can_play(col):  # if column is not full and piece can be dropped:
+            falling = FallingPiece(col, game.next_free_row(col), COLOURS[game.turn])
+            clock.tick()  # the animation starts now
+
+    def land():
+        nonlocal falling
+        game.play(falling.col)  # drop piece (and check whether it wins)
+        falling = None
+        game_board.draw_board(game)  # update GUI board
+        print_board(game.board)  # print board
+        if game.over:
+            # show winner in GUI, then stop after END_DELAY_MS:
+            record_game(game)
+            color_fill, text_box = print_winner_terminal(game)
+            screen.fill(color_fill)
+            pygame.display.set_caption(TITLE)  # set title of the window
+            winner_box = BoxMessage(H // 3, W // 3, W / 2, 32, text_box)
+            winner_box.draw()
+            pygame.display.update()
+            pygame.time.set_timer(GAME_OVER_EVENT, END_DELAY_MS, 1)
+            return
+        if ai_to_move():
+            # AI moves after AI_DELAY_MS:
+            pygame.time.set_timer(AI_TURN_EVENT, AI_DELAY_MS, 1)
+        else:
+            human_to_move()
 
-    # update screen:
-    pygame.display.update()
+    if ai_to_move():
+        pygame.time.set_timer(AI_TURN_EVENT, AI_DELAY_MS, 1)
+    else:
+        human_to_move()
+    while running:
+        if falling is None:
+            # nothing to animate: sleep until something happens
+            events = [pygame.event.wait()] + pygame.event.get()
+        else:
+            events = pygame.event.get()
+        for event in events:
+            if event.type == pygame.QUIT:
+                running = False
+            elif event.type == GAME_OVER_EVENT:
+                # stop program from running:
+                running = False
+            elif event.type == AI_TURN_EVENT and not game.over and falling is None:
+                if background is None:
+                    drop(choose_ai_move())
+                else:
+                    # search runs on the bitboard of the game:
+                    background.start(game.position.copy())
+            elif event.type == AI_SEARCH_EVENT and not game.over:
+                kind, _, col_, score, stats = event.message
+                if kind == 'depth':
+                    pygame.display.set_caption('%s - AI thinking: depth %d, best column %d' % (TITLE, stats.depth,
+                                                                                             col_ + 1))
+                elif kind == 'done':
+                    pygame.display.set_caption(TITLE)
+                    print('AI search:', stats)  # nodes, cutoffs and time per depth of the move
+                    drop(col_)
+            elif game.over or falling is not None or ai_to_move():
+                # not the human's turn: clicks and mouse moves are ignored
+                continue
+            # if mouse click, the human player drops a piece:
+            elif event.type == pygame.MOUSEBUTTONUP:
+                drop(event.pos[0] // SQUARE_SIZE)
+            # if mouse is moving, make ball appear like it's in motion:
+            elif event.type == pygame.MOUSEMOTION:
+                draw_hover(event.pos[0])
+        if falling is not None and running:
+            landed = falling.update(clock.tick(fps) / 1000)
+            pygame.display.update(falling.draw())
+            if landed:
+                land()
+    if background is not None:
+        background.cancel()
+    if not game.over:
+        record_game(game)
 
 
 def play_easy_game():
@@ -744,220 +446,35 @@ def play_easy_game():
 
     Strategy for AI: choosing column at random
     """
-    global running, turn, colour, game_board, FREE_CELLS
-    while running and not is_game_over(game_board.board):
-        # if it's human player's turn:
-        if turn == 1 and colour == YELLOW and running:
-            AI_game_human_turn('easy')
-        # else if it's AI's turn and game is not over:
-        elif colour == RED and turn == 2 and running:
-            available_moves = get_available_moves(game_board.board)
-            random.shuffle(available_moves, randomize)
-
-            col_ = random.choice(available_moves)
-            row_ = next_free_row_on_col(game_board.board, col_)
-            piece = Piece(RED, game_board.board)
-            piece.drop_piece(game_board.board, RED, row_, col_)
-
-            # updating free cells count:
-            FREE_CELLS = decrement(FREE_CELLS)
-            # updating score for AI:
-            computer.inc_score()
-            # updating GUI:
-            game_board.draw_board()  # update GUI board
-            print_board(game_board.board)  # print board
-            pygame.display.update()
-            if is_game_over(game_board.board):
-                print("You lose! AI wins!")
-                running = False
-            # switch players:
-            colour, turn = switch_player(colour, turn)
+    main_loop(lambda: random.choice(game.legal_moves()))
 
 
 def play_medium_game():
     """
     Method for playing Connect-4 Game of human player vs. medium AI.
 
-    Strategy: minimax with max_ply = 3.
+    Strategy: opening book moves while the position is in the book (connect4.book), then
+    iterative deepening minimax up to max_ply = 3, within MEDIUM_TIME_BUDGET_MS per move.
     """
-    global running, turn, colour, game_board, FREE_CELLS
-    while running and not is_game_over(game_board.board):
-        # if it's human player's turn:
-        if turn == 1 and colour == YELLOW and running:
-            AI_game_human_turn('medium')
-        # else if it's AI's turn and game is not over:
-        elif colour == RED and turn == 2 and running:
-            alpha = -100000000000000
-            beta = 100000000000000
-            col_, score = AI_medium_player.minimax(game_board.board, 3, alpha, beta, turn)
-
-            row_ = next_free_row_on_col(game_board.board, col_)
-            piece = Piece(RED, game_board.board)
-            piece.drop_piece(game_board.board, RED, row_, col_)
-            # updating free cells count:
-            FREE_CELLS = decrement(FREE_CELLS)
-            # updating score for AI:
-            computer.inc_score()
-            # updating GUI:
-            game_board.draw_board()  # update GUI board
-            print_board(game_board.board)  # print board
-            pygame.display.update()
-            if is_game_over(game_board.board):
-                # check who won:
-                color_fill = WHITE
-                if winner == 0:
-                    print('Tie!\nScore: ', human.score, '-', computer.score)
-                    text_box: str = "It's a tie!"
-                elif winner == 1:
-                    print('You won!\nScore:', human.score, '-', computer.score)
-                    text_box: str = "You won! Congratulations!"
-                else:  # if winner == 2
-                    print('You lost!\nTotal score:', human.score, '-', computer.score)
-                    text_box: str = "AI wins! You lost!"
-                # update GUI board:
-                screen.fill(color_fill)  # set background colour to white
-                pygame.display.set_caption(TITLE)  # set title of the window
-
-                # show winner in GUI:
-                winner_box = BoxMessage(H // 3, W // 3, W / 2, 32, text_box)
-                winner_box.draw()
-                pygame.display.update()
-                time.sleep(2)  # sleep for two seconds after showing winner
-
-                # stop program from running:
-                running = False
-            # switch players:
-            colour, turn = switch_player(colour, turn)
+    with BackgroundSearch(make_ai, 'medium', ROWS, COLS, on_message=post_search_message) as background:
+        main_loop(background=background)
 
 
 def play_hard_game():
     """
-    Method for playing Connect-4 Game of human player vs. medium AI.
+    Method for playing Connect-4 Game of human player vs. hard AI.
 
-    Strategy: minimax with max_ply = 5 and capacity to block winning moves.
+    Strategy: opening book moves while the position is in the book (connect4.book), then
+    iterative deepening minimax up to max_ply = 7, within HARD_TIME_BUDGET_MS per move,
+    and the exact solver (connect4.solver) once few cells are left.
     """
-    global running, turn, colour, game_board, FREE_CELLS
-    while running and not is_game_over(game_board.board):
-        # if it's human player's turn:
-        if turn == 1 and colour == YELLOW and running:
-            AI_game_human_turn('medium')
-        # else if it's AI's turn and game is not over:
-        elif colour == RED and turn == 2 and running:
-            alpha = -100000000000000
-            beta = 100000000000000
-            col_, score = AI_hard_player.minimax(game_board.board, 7, alpha, beta, turn)
-
-            row_ = next_free_row_on_col(game_board.board, col_)
-            piece = Piece(RED, game_board.board)
-            piece.drop_piece(game_board.board, RED, row_, col_)
-            # updating free cells count:
-            FREE_CELLS = decrement(FREE_CELLS)
-            # updating score for AI:
-            computer.inc_score()
-            # updating GUI:
-            game_board.draw_board()  # update GUI board
-            print_board(game_board.board)  # print board
-            pygame.display.update()
-            if is_game_over(game_board.board):
-                # check who won:
-                color_fill = WHITE
-                if winner == 0:
-                    print('Tie!\nScore: ', human.score, '-', computer.score)
-                    text_box: str = "It's a tie!"
-                elif winner == 1:
-                    print('You won!\nScore:', human.score, '-', computer.score)
-                    text_box: str = "You won! Congratulations!"
-                else:  # if winner == 2
-                    print('You lost!\nTotal score:', human.score, '-', computer.score)
-                    text_box: str = "AI wins! You lost!"
-                # update GUI board:
-                screen.fill(color_fill)  # set background colour to white
-                pygame.display.set_caption(TITLE)  # set title of the window
-
-                # show winner in GUI:
-                winner_box = BoxMessage(H // 3, W // 3, W / 2, 32, text_box)
-                winner_box.draw()
-                pygame.display.update()
-                time.sleep(2)  # sleep for two seconds after showing winner
-
-                # stop program from running:
-                running = False
-            # switch players:
-            colour, turn = switch_player(colour, turn)
+    with BackgroundSearch(make_ai, 'hard', ROWS, COLS, on_message=post_search_message) as background:
+        main_loop(background=background)
 
 
 # play Connect-4 with a different opponent:
 def multiplayer():
-    global game_board, running, FREE_CELLS, turn, colour
-    game_board.draw_board()
-    while running:
-        for event in pygame.event.get():  # the event loop
-
-            if event.type == pygame.QUIT:
-                running = False
-                exit()  # quit game
-
-            # if mouse click:
-            elif event.type == pygame.MOUSEBUTTONUP or event.type == pygame.MOUSEBUTTONDOWN and event.button == left:
-                # piece is dropped; update board
-                # pos = pygame.mouse.get_pos()
-                row = event.pos[0]
-                col = int(np.math.floor(row / SQUARE_SIZE))
-                # get #row where piece is dropped:
-                drop_on_row = next_free_row_on_col(game_board.board, col)
-                piece = Piece(colour, game_board.board)
-                # update board:
-                if drop_on_row != -1:  # if column is not empty and piece can be dropped:
-                    piece.drop_piece(game_board.board, colour, drop_on_row, col)  # drop piece
-                    FREE_CELLS = FREE_CELLS - 1
-                    game_board.draw_board()  # update GUI board
-                    print_board(game_board.board)  # print board
-                    colour, turn = switch_player(colour, turn)  # switch players
-                    # update score:
-                    if turn == 2:
-                        computer.inc_score()
-                    else:
-                        human.inc_score()
-
-                pygame.display.update()
-
-            # if mouse is moving, make ball appear like it's in motion:
-            elif event.type == pygame.MOUSEMOTION:
-                # position to drop piece:
-                row = event.pos[0]
-                # moving piece to drop:
-                pygame.draw.rect(screen, WHITE, (0, 0, SQUARE_SIZE * COLS, SQUARE_SIZE))
-                pygame.draw.circle(screen, colour, (row, SQUARE_SIZE // 2), RADIUS)
-                pygame.display.update()
-
-            # stop condition:
-            if is_game_over(game_board.board):
-                # check who won:
-                color_fill = WHITE
-                if winner == 0:
-                    print('Tie!\nScore: ', human.score, '-', computer.score)
-                    text_box: str = "It's a tie!"
-                elif winner == 1:
-                    print('Player 1 wins!\nScore:', human.score, '-', computer.score)
-                    text_box: str = "Player 1 wins! Congratulations!"
-                else:  # if winner == 2
-                    print('Player 2 wins!\nTotal score:', human.score, '-', computer.score)
-                    text_box: str = "Player 2 wins! Congratulations!"
-                # update GUI board:
-                screen.fill(color_fill)  # set background colour to white
-                pygame.display.set_caption(TITLE)  # set title of the window
-
-                # show winner in GUI:
-                winner_box = BoxMessage(H // 3, W // 3, W / 2, 32, text_box)
-                winner_box.draw()
-                pygame.display.update()
-                time.sleep(2)  # sleep for two seconds after showing winner
-
-                # stop program from running:
-                running = False
-
-            # update screen:
-            pygame.display.update()
+    main_loop()
 
 
 def play_game():
@@ -966,12 +483,14 @@ def play_game():
 
     :return: game of connect-4
     """
-    global running, screen, number_of_moves
-
     if OPPONENT == 'human':
         multiplayer()
+    elif DIFFICULTY is not None:
+        # difficulty given in the settings:
+        {'easy': play_easy_game, 'medium': play_medium_game, 'hard': play_hard_game}[DIFFICULTY]()
     elif OPPONENT == 'computer':
         # creating window with difficulty buttons:
+        from tkinter import Button, CENTER, Label, Tk
         root_ = Tk()
         label = Label(root_, text="Choose AI difficulty: ")
         label.pack()
@@ -1002,5 +521,6 @@ def play_game():
 
 
 if __name__ == "__main__":
+    setup(read_config())
     play_game()
     pygame.quit()